@@ -1,8 +1,34 @@
+import inspect
+import logging
+import os
 import torch
 import torch.nn.functional as F
 import numpy as np
 from scipy.ndimage import gaussian_filter
-from skimage import feature, color, exposure
+from skimage import feature, color
+from .seamless_cache import result_cache
+from .seamless_clahe import equalize_adapthist
+from .seamless_cut import min_cut_seam, seam_alpha
+from .seamless_edges import EDGE_MAPS
+from .seamless_executor import parallel_map, worker_limit, worker_count, torch_threads_per_worker, check_interrupt
+from .seamless_masks import seamless_blend_mask, edge_blur_mask, edge_fade_mask
+from .seamless_plan import TexturePlan, mip_chain
+from .seamless_process import process_pool
+from .seamless_seams import gradient_energy, seam_score, search_overlap
+from .seamless_tiling import budget_tile_size, iter_tiles, gaussian_radius, canny_halo
+from .seamless_torch import TorchSeamlessEngine, estimate_illumination
+from .seamless_wang import WANG_TILES, wang_cells
+from .skb_profiler import span
+
+try:
+    import folder_paths
+except ImportError:
+    folder_paths = None
+
+STORAGE_DTYPES = {"float32": torch.float32, "float16": torch.float16, "bfloat16": torch.bfloat16}
+logger = logging.getLogger(__name__)
+
+EXPORT_EXCLUDED_INPUTS = ("tile_size", "disk_cache", "cache_dir", "precision", "backend", "mipmaps", "mip_min_size", "output_edge_map")
 
 class SeamlessTexture:
     @classmethod
@@ -12,7 +38,7 @@ class SeamlessTexture:
                 "image": ("IMAGE",),
                 "tile_size": ("INT", {"default": 512, "min": 64, "max": 2048, "step": 64}),
                 "overlap": ("INT", {"default": 64, "min": 0, "max": 256, "step": 8}),
-                "pattern_type": (["simple", "mirror", "rotate"], {"default": "simple"}),
+                "pattern_type": (["simple", "mirror", "rotate", "min_cut"], {"default": "simple", "tooltip": "rotate always builds a (2 x longest side)² canvas, zero-padded for non-square inputs; the other patterns stay close to the input size."}),
                 "interpolation": (["nearest", "bilinear", "bicubic"], {"default": "bilinear"}),
                 "repeat_count": ("INT", {"default": 1, "min": 1, "max": 10, "step": 1}),
                 "texture_direction": (["horizontal", "vertical", "diagonal"], {"default": "horizontal"}),
@@ -25,194 +51,348 @@ class SeamlessTexture:
                 "color_correction_clip_limit": ("FLOAT", {"default": 0.03, "min": 0.01, "max": 0.1, "step": 0.01}),
                 "light_equalization": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 100.0, "step": 1.0}),
                 "gradient_removal": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 100.0, "step": 1.0}),
+            },
+            "optional": {
+                "engine": (["numpy", "torch"], {"default": "numpy"}),
+                "gradient_estimator": (["gaussian", "pyramid", "fft"], {"default": "gaussian"}),
+                "fuse_lab_stages": ("BOOLEAN", {"default": False, "tooltip": "Run gradient removal and light equalization in one Lab pass. Faster, but skips the RGB gamut clamp between them, so results can differ slightly from running the stages in turn."}),
+                "memory_budget_mb": ("INT", {"default": 0, "min": 0, "max": 65536, "step": 256}),
+                "disk_cache": ("BOOLEAN", {"default": False}),
+                "cache_dir": ("STRING", {"default": ""}),
+                "precision": (list(STORAGE_DTYPES), {"default": "float32"}),
+                "max_workers": ("INT", {"default": 0, "min": 0, "max": 256, "step": 1}),
+                "auto_overlap": ("BOOLEAN", {"default": False, "tooltip": "Search for the overlap with the least visible seam (simple, rotate and min_cut patterns). The mirror pattern does not use overlap, so it is unaffected."}),
+                "cut_feather": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                "repeat_mode": (["tile", "wang"], {"default": "tile"}),
+                "wang_seed": ("INT", {"default": 0, "min": 0, "max": 0xffffffff}),
+                "mipmaps": ("BOOLEAN", {"default": False}),
+                "mip_min_size": ("INT", {"default": 1, "min": 1, "max": 4096, "step": 1}),
+                "backend": (["thread", "process"], {"default": "thread"}),
+                "output_edge_map": ("BOOLEAN", {"default": False, "tooltip": "Fill the edge_map output even when detail_level is 1.0. Otherwise it is only computed when detail adjustment needs it and is left empty."}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE",)
+    RETURN_TYPES = ("IMAGE", "IMAGE", "MASK", "INT", "FLOAT", "IMAGE")
+    RETURN_NAMES = ("image", "preview", "edge_map", "overlap", "seam_score", "mips")
+    OUTPUT_IS_LIST = (False, False, False, False, False, True)
     FUNCTION = "generate"
     CATEGORY = "SKB/display"
 
-    def generate(self, image, tile_size, overlap, pattern_type, interpolation, repeat_count, texture_direction, detail_level, edge_padding, edge_blur, edge_fade, light_equalization, gradient_removal, color_correction, color_correction_strength, color_correction_clip_limit):
-        image_np = image.squeeze().cpu().numpy()
+    def generate(self, image, disk_cache=False, cache_dir="", max_workers=0, backend="thread", **params):
+        if backend == "process":
+            return process_pool().run(type(self), "generate", image, disk_cache, cache_dir, max_workers, **params)
+        with worker_limit(max_workers):
+            return self.cached_render(image, disk_cache, cache_dir, **params)
+
+    def cached_render(self, image, disk_cache=False, cache_dir="", **params):
+        if not disk_cache:
+            return self.render_batch(image, **params)
+        
+        arguments = inspect.signature(self.render).bind(image, **params)
+        arguments.apply_defaults()
+        params = dict(arguments.arguments)
+        del params["image"]
+        
+        cache = result_cache(cache_dir)
+        key = cache.key(image, params)
+        result = cache.get(key)
+        if result is None or len(result) != len(self.RETURN_TYPES):
+            result = self.render_batch(image, **params)
+            cache.put(key, result)
+        return result
+
+    def render_batch(self, image, **params):
+        workers = min(worker_count(), image.shape[0] if image.ndim == 4 else 1)
+        if params.get("engine", "numpy") != "numpy" or params.get("auto_overlap") or workers <= 1:
+            return self.render(image, **params)
+        
+        with torch_threads_per_worker(workers):
+            parts = parallel_map(lambda item: self.render(item, **params), image.split(1))
+        return tuple(self.merge_outputs(outputs) for outputs in zip(*parts))
+
+    def merge_outputs(self, outputs):
+        if isinstance(outputs[0], list):
+            return [torch.cat(levels) for levels in zip(*outputs)]
+        if torch.is_tensor(outputs[0]):
+            return torch.cat(outputs)
+        return type(outputs[0])(sum(outputs) / len(outputs))
+
+    def render(self, image, tile_size, overlap, pattern_type, interpolation, repeat_count, texture_direction, detail_level, edge_padding, edge_blur, edge_fade, light_equalization, gradient_removal, color_correction, color_correction_strength, color_correction_clip_limit, engine="numpy", gradient_estimator="gaussian", memory_budget_mb=0, precision="float32", auto_overlap=False, cut_feather=0, repeat_mode="tile", wang_seed=0, mipmaps=False, mip_min_size=1, output_edge_map=False, fuse_lab_stages=False):
+        plan, layers, overlap, score = self.prepare(image, overlap, pattern_type, repeat_count, texture_direction, detail_level, edge_padding, edge_blur, edge_fade, light_equalization, gradient_removal, color_correction, color_correction_strength, color_correction_clip_limit, engine, gradient_estimator, memory_budget_mb, auto_overlap, cut_feather, repeat_mode, wang_seed, output_edge_map, fuse_lab_stages)
         
-        if image_np.ndim == 3 and image_np.shape[2] == 3:
-            pass
-        elif image_np.ndim == 3 and image_np.shape[0] == 3:
-            image_np = np.transpose(image_np, (1, 2, 0))
+        check_interrupt()
+        with span("resample"):
+            layers = plan.resample(layers.to(STORAGE_DTYPES[precision]), tile_size, tile_size, interpolation).float()
+        seamless, edge_map = layers[:, :-1], layers[:, -1:]
+        preview = F.interpolate(seamless, size=(256, 256), mode='bilinear', align_corners=False)
+        
+        if mipmaps:
+            with span("mipmaps"):
+                mips = mip_chain(seamless, mip_min_size)
         else:
-            raise ValueError(f"Unexpected image shape: {image_np.shape}")
+            mips = [seamless]
         
+        seamless = seamless.permute(0, 2, 3, 1)
+        preview = preview.permute(0, 2, 3, 1)
+        mips = [level.permute(0, 2, 3, 1) for level in mips]
+        
+        return (seamless, preview, edge_map[:, 0], overlap, score, mips)
+
+    def prepare(self, image, overlap, pattern_type, repeat_count, texture_direction, detail_level, edge_padding, edge_blur, edge_fade, light_equalization, gradient_removal, color_correction, color_correction_strength, color_correction_clip_limit, engine="numpy", gradient_estimator="gaussian", memory_budget_mb=0, auto_overlap=False, cut_feather=0, repeat_mode="tile", wang_seed=0, output_edge_map=False, fuse_lab_stages=False):
+        stages = TorchSeamlessEngine() if engine == "torch" else self
+        texture = stages.to_batch(image)
+        
+        lab_operations = []
         if gradient_removal > 0:
-            image_np = self.apply_gradient_removal(image_np, gradient_removal / 100.0)
-            
+            lab_operations.append(("gradient_removal", (gradient_removal / 100.0, gradient_estimator)))
         if light_equalization > 0:
-            image_np = self.apply_light_equalization(image_np, light_equalization / 100.0)
-        
+            lab_operations.append(("light_equalization", (light_equalization / 100.0,)))
+        check_interrupt()
+        if lab_operations:
+            with span("lab_stage"):
+                if fuse_lab_stages:
+                    texture = stages.apply_lab_stage(texture, lab_operations, memory_budget_mb)
+                else:
+                    for operation in lab_operations:
+                        texture = stages.apply_lab_stage(texture, [operation], memory_budget_mb)
+        
+        check_interrupt()
         if edge_blur > 0:
-            image_np = self.apply_edge_blur(image_np, edge_blur / 100.0)
+            with span("edge_blur"):
+                texture = stages.apply_edge_blur(texture, edge_blur / 100.0, memory_budget_mb)
         
         if edge_fade > 0:
-            image_np = self.apply_edge_fade(image_np, edge_fade / 100.0)
+            with span("edge_fade"):
+                texture = stages.apply_edge_fade(texture, edge_fade / 100.0)
         
         if edge_padding > 0:
-            image_np = self.apply_edge_padding(image_np, edge_padding)
+            texture = stages.apply_edge_padding(texture, edge_padding)
         
-        h, w, c = image_np.shape
+        h, w = stages.image_size(texture)
         overlap = min(overlap, h // 2, w // 2)
         overlap = max(1, overlap)
         
-        if pattern_type == "simple":
-            seamless = self.simple_seamless(image_np, overlap)
-        elif pattern_type == "mirror":
-            seamless = self.mirror_seamless(image_np, overlap)
-        elif pattern_type == "rotate":
-            seamless = self.rotate_seamless(image_np, overlap)
-        else:
-            raise ValueError(f"Unknown pattern type: {pattern_type}")
+        # Only mirror is planned through index maps. The rotate canvas swaps axes per quadrant and carries
+        # overlap strips, so it is not separable, and colour correction and detail run on the composed canvas.
+        mirror_plan = pattern_type == "mirror" and not color_correction and repeat_mode == "tile"
         
+        patterns = {
+            "simple": lambda texture, overlap: stages.simple_seamless(texture, overlap, memory_budget_mb),
+            "rotate": stages.rotate_seamless,
+            "min_cut": lambda texture, overlap: stages.min_cut_seamless(texture, overlap, cut_feather),
+        }
+        search = auto_overlap and pattern_type in patterns
+        if auto_overlap and not search:
+            logger.info(f"SeamlessTexture: auto_overlap has no effect on the {pattern_type} pattern; using overlap {overlap}.")
+        
+        check_interrupt()
+        with span(f"{pattern_type}_pattern"):
+            if search:
+                overlap, score, seamless = search_overlap(stages, texture, patterns[pattern_type], overlap)
+            elif pattern_type == "simple":
+                seamless = stages.simple_seamless(texture, overlap, memory_budget_mb)
+            elif mirror_plan:
+                seamless = texture
+            elif pattern_type == "mirror":
+                seamless = stages.mirror_seamless(texture, overlap)
+            elif pattern_type == "rotate":
+                seamless = stages.rotate_seamless(texture, overlap)
+            elif pattern_type == "min_cut":
+                seamless = stages.min_cut_seamless(texture, overlap, cut_feather)
+            else:
+                raise ValueError(f"Unknown pattern type: {pattern_type}")
+            if not search:
+                score = 0.0 if mirror_plan else seam_score(stages.to_tensor(seamless), gradient_energy(stages.to_tensor(texture)))
+        
+        check_interrupt()
         if color_correction:
-            seamless = self.apply_color_correction(seamless, color_correction_strength, color_correction_clip_limit)
-        
-        seamless = self.apply_texture_direction(seamless, texture_direction)
-        seamless = self.repeat_texture(seamless, repeat_count)
-        seamless = self.adjust_detail(seamless, detail_level)
-        
-        if seamless.ndim == 3:
-            seamless = torch.from_numpy(seamless).permute(2, 0, 1).unsqueeze(0).float()
-        elif seamless.ndim == 4:
-            seamless = torch.from_numpy(seamless).permute(0, 3, 1, 2).float()
+            with span("color_correction"):
+                seamless = stages.apply_color_correction(seamless, color_correction_strength, color_correction_clip_limit, memory_budget_mb)
+        
+        check_interrupt()
+        if detail_level != 1.0 or output_edge_map:
+            with span("detail"):
+                edges = EDGE_MAPS.get(stages, seamless, 2 / detail_level, memory_budget_mb, pad_mode="symmetric" if mirror_plan else "wrap")
+                seamless = stages.adjust_detail(seamless, detail_level, memory_budget_mb, edges)
+            layers = torch.cat((stages.to_tensor(seamless), stages.edge_tensor(edges)), dim=1)
         else:
-            raise ValueError(f"Unexpected seamless shape: {seamless.shape}")
-        
-        seamless = F.interpolate(seamless, size=(tile_size, tile_size), mode=interpolation, align_corners=False if interpolation != 'nearest' else None)
-        preview = F.interpolate(seamless, size=(256, 256), mode='bilinear', align_corners=False)
-        
-        seamless = seamless.permute(0, 2, 3, 1)
-        preview = preview.permute(0, 2, 3, 1)
-        
-        return (seamless, preview)
+            layers = stages.to_tensor(seamless)
+            layers = torch.cat((layers, layers.new_zeros(layers[:, :1].shape)), dim=1)
+        if repeat_mode == "wang":
+            check_interrupt()
+            with span("wang_tiles"):
+                layers = WANG_TILES.get(layers, overlap, wang_seed, layers.shape[1] - 1, cut_feather)
+            plan = TexturePlan(*stages.image_size(seamless), repeat_count, texture_direction, cells=wang_cells(repeat_count, repeat_count, wang_seed))
+        else:
+            plan = TexturePlan(*stages.image_size(seamless), repeat_count, texture_direction, mirror=mirror_plan)
+        return plan, layers, overlap, score
 
-    def simple_seamless(self, image, overlap):
-        h, w, c = image.shape
-        seamless = np.zeros((h + overlap*2, w + overlap*2, c), dtype=np.float32)
-        
-        seamless[overlap:-overlap, overlap:-overlap, :] = image
-        seamless[:overlap, overlap:-overlap, :] = image[-overlap:, :, :]
-        seamless[-overlap:, overlap:-overlap, :] = image[:overlap, :, :]
-        seamless[overlap:-overlap, :overlap, :] = image[:, -overlap:, :]
-        seamless[overlap:-overlap, -overlap:, :] = image[:, :overlap, :]
-        
-        seamless[:overlap, :overlap, :] = image[-overlap:, -overlap:, :]
-        seamless[:overlap, -overlap:, :] = image[-overlap:, :overlap, :]
-        seamless[-overlap:, :overlap, :] = image[:overlap, -overlap:, :]
-        seamless[-overlap:, -overlap:, :] = image[:overlap, :overlap, :]
-        
-        mask = np.ones((h + overlap*2, w + overlap*2, 1))
-        mask[overlap:-overlap, overlap:-overlap] = 0
-        
-        x = np.linspace(-3, 3, overlap)
-        transition = 1 / (1 + np.exp(-x))
-        transition = transition.reshape(-1, 1)
+    def to_batch(self, image):
+        image_np = image.cpu().numpy()
         
-        for i in range(overlap):
-            mask[i, overlap:-overlap] = transition[i, 0]
-            mask[-(i+1), overlap:-overlap] = transition[-(i+1), 0]
-            mask[overlap:-overlap, i] = transition[i, 0]
-            mask[overlap:-overlap, -(i+1)] = transition[-(i+1), 0]
+        if image_np.ndim == 3:
+            image_np = image_np[np.newaxis, ...]
         
-        for i in range(overlap):
-            for j in range(overlap):
-                weight = transition[i, 0] * transition[j, 0]
-                mask[i, j] = weight
-                mask[i, -(j+1)] = weight
-                mask[-(i+1), j] = weight
-                mask[-(i+1), -(j+1)] = weight
-        
-        mask = gaussian_filter(mask, sigma=overlap/4)
-        mask = np.repeat(mask, 3, axis=2)
-        
-        edges = feature.canny(np.mean(image, axis=2), sigma=2)
-        edge_weight = gaussian_filter(edges.astype(float), sigma=2)
-        edge_weight = np.pad(edge_weight, ((overlap, overlap), (overlap, overlap)), mode='edge')
-        edge_weight = np.expand_dims(edge_weight, -1)
-        edge_weight = np.repeat(edge_weight, 3, axis=2)
-        
-        mask = mask * (1 - edge_weight * 0.5)
-        
-        blended = seamless.copy()
-        blended[overlap:-overlap, overlap:-overlap, :] = image * (1 - mask[overlap:-overlap, overlap:-overlap]) + seamless[overlap:-overlap, overlap:-overlap, :] * mask[overlap:-overlap, overlap:-overlap]
+        if image_np.ndim == 4 and image_np.shape[3] == 3:
+            pass
+        elif image_np.ndim == 4 and image_np.shape[1] == 3:
+            image_np = np.transpose(image_np, (0, 2, 3, 1))
+        else:
+            raise ValueError(f"Unexpected image shape: {image_np.shape}")
         
-        return blended
+        return np.ascontiguousarray(image_np, dtype=np.float32)
+
+    def to_tensor(self, image):
+        return torch.from_numpy(np.ascontiguousarray(image)).permute(0, 3, 1, 2).float()
+
+    def edge_tensor(self, edges):
+        return torch.from_numpy(np.ascontiguousarray(edges))[:, np.newaxis].float()
+
+    def image_size(self, image):
+        return image.shape[1], image.shape[2]
+
+    def simple_seamless(self, image, overlap, memory_budget_mb=0):
+        b, h, w, c = image.shape
+        seamless = np.zeros((b, h + overlap*2, w + overlap*2, c), dtype=np.float32)
+        
+        seamless[:, overlap:-overlap, overlap:-overlap, :] = image
+        seamless[:, :overlap, overlap:-overlap, :] = image[:, -overlap:, :, :]
+        seamless[:, -overlap:, overlap:-overlap, :] = image[:, :overlap, :, :]
+        seamless[:, overlap:-overlap, :overlap, :] = image[:, :, -overlap:, :]
+        seamless[:, overlap:-overlap, -overlap:, :] = image[:, :, :overlap, :]
+        
+        seamless[:, :overlap, :overlap, :] = image[:, -overlap:, -overlap:, :]
+        seamless[:, :overlap, -overlap:, :] = image[:, -overlap:, :overlap, :]
+        seamless[:, -overlap:, :overlap, :] = image[:, :overlap, -overlap:, :]
+        seamless[:, -overlap:, -overlap:, :] = image[:, :overlap, :overlap, :]
+        
+        mask = seamless_blend_mask(h, w, overlap)
+        edge_weight = EDGE_MAPS.get(self, image, 2, memory_budget_mb, smooth=2)
+        
+        def blend(unit):
+            items, (_, _, (rows, cols)) = unit
+            inner_rows = slice(rows.start + overlap, rows.stop + overlap)
+            inner_cols = slice(cols.start + overlap, cols.stop + overlap)
+            inner = mask.region(inner_rows, inner_cols) * (1 - edge_weight[items, rows, cols] * 0.5)
+            inner = inner[..., np.newaxis]
+            center = seamless[items, inner_rows, inner_cols]
+            center[...] = image[items, rows, cols] * (1 - inner) + center * inner
+        
+        parallel_map(blend, self.work_units(b, iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb))))
+        return seamless
+
+    def work_units(self, batch, tiles):
+        return [(slice(i, i + 1), tile) for tile in tiles for i in range(batch)]
+
+    def edge_map(self, image, sigma, memory_budget_mb=0, smooth=0, pad_mode=None):
+        halo = canny_halo(sigma) + (gaussian_radius(smooth) if smooth else 0)
+        if pad_mode is not None:
+            padded = np.pad(image, ((0, 0), (halo, halo), (halo, halo), (0, 0)), mode=pad_mode)
+            return self.edge_map(padded, sigma, memory_budget_mb, smooth)[:, halo:-halo, halo:-halo]
+        
+        b, h, w, c = image.shape
+        edges = np.empty((b, h, w), dtype=np.float32 if smooth else bool)
+        
+        def detect(unit):
+            items, ((src_rows, src_cols), (crop_rows, crop_cols), (rows, cols)) = unit
+            tile_edges = feature.canny(np.mean(image[items, src_rows, src_cols][0], axis=2), sigma=sigma)
+            if smooth:
+                tile_edges = gaussian_filter(tile_edges.astype(np.float32), sigma=smooth)
+            edges[items, rows, cols] = tile_edges[crop_rows, crop_cols]
+        
+        parallel_map(detect, self.work_units(b, iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb, halo), halo)))
+        return edges
 
     def mirror_seamless(self, image, overlap):
-        h, w, c = image.shape
-        seamless = np.zeros((h*2, w*2, c), dtype=np.float32)
-        seamless[:h, :w, :] = image
-        seamless[:h, w:, :] = np.fliplr(image)
-        seamless[h:, :w, :] = np.flipud(image)
-        seamless[h:, w:, :] = np.flipud(np.fliplr(image))
+        b, h, w, c = image.shape
+        seamless = np.zeros((b, h*2, w*2, c), dtype=np.float32)
+        seamless[:, :h, :w, :] = image
+        seamless[:, :h, w:, :] = image[:, :, ::-1, :]
+        seamless[:, h:, :w, :] = image[:, ::-1, :, :]
+        seamless[:, h:, w:, :] = image[:, ::-1, ::-1, :]
         return seamless
 
     def rotate_seamless(self, image, overlap):
-        h, w, c = image.shape
+        b, h, w, c = image.shape
         max_dim = max(h, w)
-        seamless = np.zeros((max_dim*2, max_dim*2, c), dtype=np.float32)
+        seamless = np.zeros((b, max_dim*2, max_dim*2, c), dtype=np.float32)
         
-        seamless[:h, :w, :] = image
+        seamless[:, :h, :w, :] = image
         
-        rotated_90 = np.rot90(image)
-        seamless[max_dim:max_dim+rotated_90.shape[0], :rotated_90.shape[1], :] = rotated_90
+        rotated_90 = np.rot90(image, axes=(1, 2))
+        seamless[:, max_dim:max_dim+rotated_90.shape[1], :rotated_90.shape[2], :] = rotated_90
         
-        rotated_180 = np.rot90(image, 2)
-        seamless[max_dim:max_dim+rotated_180.shape[0], max_dim:max_dim+rotated_180.shape[1], :] = rotated_180
+        rotated_180 = np.rot90(image, 2, axes=(1, 2))
+        seamless[:, max_dim:max_dim+rotated_180.shape[1], max_dim:max_dim+rotated_180.shape[2], :] = rotated_180
         
-        rotated_270 = np.rot90(image, 3)
-        seamless[:rotated_270.shape[0], max_dim:max_dim+rotated_270.shape[1], :] = rotated_270
+        rotated_270 = np.rot90(image, 3, axes=(1, 2))
+        seamless[:, :rotated_270.shape[1], max_dim:max_dim+rotated_270.shape[2], :] = rotated_270
         
-        seamless[h:h+overlap, :w, :] = image[:overlap, :, :]
-        seamless[:h, w:w+overlap, :] = image[:, :overlap, :]
-        seamless[max_dim+h-overlap:max_dim+h, max_dim:max_dim+w, :] = image[-overlap:, :, :]
-        seamless[max_dim:max_dim+h, max_dim+w-overlap:max_dim+w, :] = image[:, -overlap:, :]
+        seamless[:, h:h+overlap, :w, :] = image[:, :overlap, :, :]
+        seamless[:, :h, w:w+overlap, :] = image[:, :, :overlap, :]
+        seamless[:, max_dim+h-overlap:max_dim+h, max_dim:max_dim+w, :] = image[:, -overlap:, :, :]
+        seamless[:, max_dim:max_dim+h, max_dim+w-overlap:max_dim+w, :] = image[:, :, -overlap:, :]
         
         return seamless
 
+    def min_cut_seamless(self, image, overlap, feather=0):
+        columns = self._cut_columns(image, overlap, feather)
+        rows = self._cut_columns(columns.transpose(0, 2, 1, 3), overlap, feather)
+        return np.ascontiguousarray(rows.transpose(0, 2, 1, 3))
+
+    def _cut_columns(self, image, overlap, feather):
+        w = image.shape[2]
+        before, after = image[:, :, w - overlap:], image[:, :, :overlap]
+        seams = min_cut_seam(((before - after) ** 2).sum(axis=-1))
+        alpha = seam_alpha(seams, overlap, feather)[..., np.newaxis]
+        result = image[:, :, :w - overlap].astype(np.float32)
+        result[:, :, :overlap] = before * (1 - alpha) + after * alpha
+        return result
+
     def apply_texture_direction(self, image, direction):
         if direction == "horizontal":
             return image
         elif direction == "vertical":
-            return np.rot90(image)
+            return np.rot90(image, axes=(1, 2))
         elif direction == "diagonal":
-            return np.rot90(image, 3)
+            return np.rot90(image, 3, axes=(1, 2))
         return image
 
     def repeat_texture(self, image, repeat_count):
-        return np.tile(image, (repeat_count, repeat_count, 1))
+        return np.tile(image, (1, repeat_count, repeat_count, 1))
 
-    def apply_edge_blur(self, image, edge_blur):
-        h, w, c = image.shape
+    def apply_edge_blur(self, image, edge_blur, memory_budget_mb=0):
+        b, h, w, c = image.shape
         result = image.copy()
         
         blur_width = max(1, int(edge_blur * min(h, w) * 0.1))
-        mask = np.zeros((h, w))
-        
-        for i in range(blur_width):
-            alpha = 1 - (1 / (1 + np.exp(-(i - blur_width/2))))
-            mask[i, :] = np.maximum(mask[i, :], alpha)
-            mask[-i-1, :] = np.maximum(mask[-i-1, :], alpha)
-            mask[:, i] = np.maximum(mask[:, i], alpha)
-            mask[:, -i-1] = np.maximum(mask[:, -i-1], alpha)
-        
-        mask = np.stack([mask] * c, axis=-1)
-        blurred = np.zeros_like(result)
+        sigma = blur_width / 3
+        halo = gaussian_radius(sigma)
+        mask = edge_blur_mask(h, w, blur_width)
+        
+        def blur(unit):
+            items, ((src_rows, src_cols), (crop_rows, crop_cols), (rows, cols)) = unit
+            alpha = mask.region(rows, cols)[..., np.newaxis]
+            if not alpha.any():
+                return
+            blurred = self.blur_channels(image[items, src_rows, src_cols], sigma)
+            result[items, rows, cols] = image[items, rows, cols] * (1 - alpha) + blurred[:, crop_rows, crop_cols] * alpha
+        
+        parallel_map(blur, self.work_units(b, iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb, halo), halo)))
+        return result
+
+    def blur_channels(self, image, sigma):
+        blurred = np.empty_like(image)
         
-        for i in range(c):
-            blurred[..., i] = gaussian_filter(result[..., i], sigma=blur_width/3)
+        def blur(index):
+            i, channel = index
+            gaussian_filter(image[i, :, :, channel], sigma, output=blurred[i, :, :, channel])
         
-        result = result * (1 - mask) + blurred * mask
-        return result
+        parallel_map(blur, np.ndindex(image.shape[0], image.shape[3]))
+        return blurred
 
     def apply_edge_padding(self, image_np, edge_padding):
-        h, w, c = image_np.shape
+        b, h, w, c = image_np.shape
         max_padding = min(h // 4, w // 4)
         edge_padding = min(edge_padding, max_padding)
         
@@ -225,113 +405,184 @@ class SeamlessTexture:
             if start_h >= end_h or start_w >= end_w:
                 return image_np
             
-            result = image_np[start_h:end_h, start_w:end_w].copy()
+            result = image_np[:, start_h:end_h, start_w:end_w].copy()
             return result
         
         return image_np
 
-    def adjust_detail(self, image, detail_level):
+    def adjust_detail(self, image, detail_level, memory_budget_mb=0, edges=None):
         if detail_level == 1.0:
             return image
         
-        if image.ndim == 4:
-            image = image.squeeze(0)
-        
-        gray = image.mean(axis=2)
-        edges = feature.canny(gray, sigma=2 / detail_level)
-        edges = np.stack([edges] * 3, axis=-1)
-        
+        if edges is None:
+            edges = self.edge_map(image, 2 / detail_level, memory_budget_mb)
         enhanced = image.copy()
         enhanced[edges] *= detail_level
-        enhanced = np.clip(enhanced, 0, 1)
-        
-        if image.ndim == 4:
-            enhanced = enhanced[np.newaxis, ...]
+        np.clip(enhanced, 0, 1, out=enhanced)
         
         return enhanced
 
-    def apply_color_correction(self, image, strength, clip_limit):
-        image_normalized = np.clip(image, 0, 1)
-        lab = color.rgb2lab(image_normalized)
-        
-        l_channel = lab[:,:,0]
-        l_channel_normalized = (l_channel - l_channel.min()) / (l_channel.max() - l_channel.min())
-        clahe = exposure.equalize_adapthist(l_channel_normalized, clip_limit=clip_limit)
-        
-        lab[:,:,0] = l_channel * (1 - strength) + (clahe * 100) * strength
-        corrected = color.lab2rgb(lab)
-        corrected = corrected * (np.max(image) - np.min(image)) + np.min(image)
-        
-        return corrected
-
     def apply_edge_fade(self, image, fade_strength):
-        h, w, c = image.shape
+        b, h, w, c = image.shape
         result = image.copy()
         fade_width = int(min(h, w) * 0.15 * fade_strength)
         
         if fade_width < 1:
             return result
         
-        mask = np.ones((h, w))
-        
-        for i in range(fade_width):
-            progress = i / fade_width
-            alpha = progress * progress * (3 - 2 * progress)
-            mask[i, :] *= alpha
-            mask[-i-1, :] *= alpha
-            mask[:, i] *= alpha
-            mask[:, -i-1] *= alpha
-        
-        mask = np.stack([mask] * c, axis=-1)
-        result *= mask
+        result *= edge_fade_mask(h, w, fade_width).region()[..., np.newaxis]
         return result
 
+    def apply_gradient_removal(self, image, strength, estimator="gaussian"):
+        return self.apply_lab_stage(image, [("gradient_removal", (strength, estimator))])
+
     def apply_light_equalization(self, image, strength):
-        h, w, c = image.shape
-        result = image.copy()
-        result = np.clip(result, 0, 1)
+        return self.apply_lab_stage(image, [("light_equalization", (strength,))])
+
+    def apply_color_correction(self, image, strength, clip_limit, memory_budget_mb=0):
+        return self.apply_lab_stage(image, [("color_correction", (strength, clip_limit))], memory_budget_mb)
+
+    def apply_lab_stage(self, image, operations, memory_budget_mb=0):
+        b, h, w, c = image.shape
+        units = self.work_units(b, iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb)))
+        keep_lab = len(units) == b
         
-        lab = color.rgb2lab(result)
-        l_channel = lab[:,:,0]
-        l_channel = (l_channel - l_channel.min()) / (l_channel.max() - l_channel.min())
+        l_channel = np.empty((b, h, w), dtype=np.float32)
         
-        l_equalized = exposure.equalize_adapthist(l_channel, kernel_size=int(min(h,w)/8), clip_limit=0.01)
-        l_mixed = l_channel * (1 - strength) + l_equalized * strength
-        l_mixed = l_mixed * (lab[:,:,0].max() - lab[:,:,0].min()) + lab[:,:,0].min()
-        lab[:,:,0] = l_mixed
+        def gather(unit):
+            items, (_, _, (rows, cols)) = unit
+            tile_lab = color.rgb2lab(np.clip(image[items, rows, cols], 0, 1))
+            l_channel[items, rows, cols] = tile_lab[..., 0]
+            return tile_lab if keep_lab else None
+        
+        labs = parallel_map(gather, units)
         
-        result = color.lab2rgb(lab)
-        result = result * (image.max() - image.min()) + image.min()
+        for name, params in operations:
+            l_channel = getattr(self, f"_lab_{name}")(l_channel, *params)
         
+        i_min = image.min(axis=(1, 2, 3), keepdims=True)
+        i_max = image.max(axis=(1, 2, 3), keepdims=True)
+        result = np.empty_like(image)
+        
+        def rebuild(indexed_unit):
+            (items, (_, _, (rows, cols))), tile_lab = indexed_unit
+            if tile_lab is None:
+                tile_lab = color.rgb2lab(np.clip(image[items, rows, cols], 0, 1))
+            tile_lab[..., 0] = l_channel[items, rows, cols]
+            result[items, rows, cols] = color.lab2rgb(tile_lab) * (i_max[items] - i_min[items]) + i_min[items]
+        
+        parallel_map(rebuild, zip(units, labs))
         return result
 
-    def apply_gradient_removal(self, image, strength):
-        h, w, c = image.shape
-        result = image.copy()
-        result = np.clip(result, 0, 1)
-        
-        lab = color.rgb2lab(result)
-        l_channel = lab[:,:,0]
-        l_channel = (l_channel - l_channel.min()) / (l_channel.max() - l_channel.min())
+    def _lab_gradient_removal(self, l_raw, strength, estimator="gaussian"):
+        b, h, w = l_raw.shape
+        l_min = l_raw.min(axis=(1, 2), keepdims=True)
+        l_max = l_raw.max(axis=(1, 2), keepdims=True)
+        l_channel = (l_raw - l_min) / (l_max - l_min)
         
         sigma = min(h, w) / 4
-        gradient = gaussian_filter(l_channel, sigma=sigma)
-        gradient = (gradient - np.min(gradient)) / (np.max(gradient) - np.min(gradient))
+        if estimator == "gaussian":
+            gradient = np.stack(parallel_map(lambda item: gaussian_filter(item, sigma), l_channel))
+        else:
+            gradient = estimate_illumination(torch.from_numpy(l_channel).unsqueeze(1), sigma, estimator)[:, 0].numpy()
+        g_min = gradient.min(axis=(1, 2), keepdims=True)
+        g_max = gradient.max(axis=(1, 2), keepdims=True)
+        gradient = (gradient - g_min) / (g_max - g_min)
         
         l_corrected = l_channel - (gradient - 0.5) * strength
         l_corrected = np.clip(l_corrected, 0, 1)
-        l_corrected = l_corrected * (lab[:,:,0].max() - lab[:,:,0].min()) + lab[:,:,0].min()
+        return l_corrected * (l_max - l_min) + l_min
+
+    def _lab_light_equalization(self, l_raw, strength):
+        b, h, w = l_raw.shape
+        l_min = l_raw.min(axis=(1, 2), keepdims=True)
+        l_max = l_raw.max(axis=(1, 2), keepdims=True)
+        l_channel = (l_raw - l_min) / (l_max - l_min)
         
-        lab[:,:,0] = l_corrected
-        result = color.lab2rgb(lab)
-        result = result * (image.max() - image.min()) + image.min()
+        l_equalized = equalize_adapthist(torch.from_numpy(l_channel), kernel_size=int(min(h,w)/8), clip_limit=0.01).numpy()
+        l_mixed = l_channel * (1 - strength) + l_equalized * strength
+        return l_mixed * (l_max - l_min) + l_min
+
+    def _lab_color_correction(self, l_raw, strength, clip_limit):
+        l_min = l_raw.min(axis=(1, 2), keepdims=True)
+        l_max = l_raw.max(axis=(1, 2), keepdims=True)
+        l_normalized = (l_raw - l_min) / (l_max - l_min)
         
-        return result
+        clahe = equalize_adapthist(torch.from_numpy(l_normalized), clip_limit=clip_limit).numpy()
+        return l_raw * (1 - strength) + (clahe * 100) * strength
+
+def export_path(filename_prefix):
+    if folder_paths is not None:
+        folder, filename, counter, _, _ = folder_paths.get_save_image_path(filename_prefix, folder_paths.get_output_directory())
+    else:
+        folder, filename = os.path.split(os.path.abspath(filename_prefix))
+        counter = 1
+        while os.path.exists(os.path.join(folder, f"{filename}_{counter:05}_.npy")):
+            counter += 1
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{filename}_{counter:05}_.npy")
+
+
+class SeamlessTextureExport:
+    @classmethod
+    def INPUT_TYPES(s):
+        inputs = SeamlessTexture.INPUT_TYPES()
+        required = {key: value for key, value in inputs["required"].items() if key not in EXPORT_EXCLUDED_INPUTS}
+        optional = {key: value for key, value in inputs["optional"].items() if key not in EXPORT_EXCLUDED_INPUTS}
+        required.update({
+            "width": ("INT", {"default": 8192, "min": 64, "max": 131072, "step": 64}),
+            "height": ("INT", {"default": 8192, "min": 64, "max": 131072, "step": 64}),
+            "filename_prefix": ("STRING", {"default": "seamless/texture"}),
+        })
+        optional.update({
+            "dtype": (["uint8", "float16", "float32"], {"default": "uint8"}),
+            "strip_rows": ("INT", {"default": 256, "min": 16, "max": 4096, "step": 16}),
+        })
+        return {"required": required, "optional": optional}
+
+    RETURN_TYPES = ("STRING", "IMAGE")
+    RETURN_NAMES = ("path", "preview")
+    FUNCTION = "export"
+    CATEGORY = "SKB/display"
+    OUTPUT_NODE = True
+
+    def export(self, image, width, height, filename_prefix, interpolation, dtype="uint8", strip_rows=256, max_workers=0, **params):
+        with worker_limit(max_workers):
+            plan, layers, _, _ = SeamlessTexture().prepare(image, **params)
+        
+        channels = layers.shape[-3] - 1
+        path = export_path(filename_prefix)
+        output = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(layers.shape[0], height, width, channels))
+        offset, item_bytes, row_bytes = output.offset, output[0].nbytes, output[0, 0].nbytes
+        del output
+        
+        with open(path, "r+b") as handle:
+            for start in range(0, height, strip_rows):
+                check_interrupt()
+                stop = min(start + strip_rows, height)
+                with span("export_strip"):
+                    strip = plan.resample(layers, height, width, interpolation, rows=(start, stop))[:, :channels]
+                    strip = self.encode(strip.permute(0, 2, 3, 1), dtype)
+                for item in range(strip.shape[0]):
+                    handle.seek(offset + item * item_bytes + start * row_bytes)
+                    handle.write(strip[item].tobytes())
+        
+        scale = 256 / max(height, width)
+        preview = plan.resample(layers, max(1, round(height * scale)), max(1, round(width * scale)), "bilinear")[:, :channels]
+        return (path, preview.permute(0, 2, 3, 1))
+
+    def encode(self, strip, dtype):
+        if dtype == "uint8":
+            return (strip.clamp(0, 1) * 255).round().to(torch.uint8).numpy()
+        return strip.to(getattr(torch, dtype)).numpy()
+
 
 NODE_CLASS_MAPPINGS = {
-    "SeamlessTexture": SeamlessTexture
+    "SeamlessTexture": SeamlessTexture,
+    "SeamlessTextureExport": SeamlessTextureExport,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "SeamlessTexture": "Seamless Texture"
+    "SeamlessTexture": "Seamless Texture",
+    "SeamlessTextureExport": "Seamless Texture Export",
 }
\ No newline at end of file
@@ -1,8 +1,6 @@
 import torch
 import numpy as np
-from PIL import Image
-import base64
-from io import BytesIO
+from .canvas_payload import load_data_url
 
 class TextBox:
     RETURN_TYPES = ("IMAGE",)
@@ -36,18 +34,16 @@ class TextBox:
         if background_visible:
             alpha = image_np[..., 3:4]
             rgb = image_np[..., :3]
-            bg_color = np.array([int(background_color[i:i+2], 16) / 255.0 for i in (1, 3, 5)])
-            bg = np.ones_like(rgb) * bg_color.reshape(1, 1, 3)
-            return rgb * alpha + bg * (1 - alpha)
-        return image_np
+            bg_color = np.array([int(background_color[i:i+2], 16) / 255.0 for i in (1, 3, 5)], dtype=np.float32)
+            return rgb * alpha + bg_color * (1 - alpha)
+        return image_np.copy()
 
     def render_text(self, text, font_size=32, text_color="#FFFFFF", text_gradient_start="", text_gradient_end="",
                    text_gradient_angle=0, background_color="#000000", width=512, height=512, position_x=256, position_y=256, 
                    rotation=0.0, opacity=1.0, background_visible=True, canvas_image=None):
         try:
             if canvas_image and canvas_image.startswith('data:image/png;base64,'):
-                image = Image.open(BytesIO(base64.b64decode(canvas_image.split(',')[1]))).convert('RGBA')
-                image_np = np.array(image).astype(np.float32) / 255.0
+                image_np = load_data_url(canvas_image, "RGBA").numpy()
                 image_np = self._process_image(image_np, background_visible, background_color)
                 return (torch.from_numpy(image_np)[None,],)
 
@@ -9,6 +9,9 @@ from .MultiFloat import NODE_CLASS_MAPPINGS as MULTIFLOAT_NODE_CLASS_MAPPINGS, N
 from .comparerplus import NODE_CLASS_MAPPINGS as COMPARER_NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as COMPARER_DISPLAY_NAME_MAPPINGS
 from .lens_flare_node import NODE_CLASS_MAPPINGS as LENS_FLARE_NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as LENS_FLARE_DISPLAY_NAME_MAPPINGS
 from .PaintPro import NODE_CLASS_MAPPINGS as PAINT_PRO_NODE_CLASS_MAPPINGS, NODE_DISPLAY_NAME_MAPPINGS as PAINT_PRO_DISPLAY_NAME_MAPPINGS
+from .canvas_payload import register_routes as register_canvas_routes
+from .paintpro_store import register_routes as register_paintpro_routes
+from .skb_profiler import instrument_node, register_routes
 
 
 NODE_CLASS_MAPPINGS = {
@@ -40,6 +43,12 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     **PAINT_PRO_DISPLAY_NAME_MAPPINGS,
 }
 
+for node_name, node_class in NODE_CLASS_MAPPINGS.items():
+    instrument_node(node_name, node_class)
+register_routes()
+register_paintpro_routes()
+register_canvas_routes()
+
 WEB_DIRECTORY = "./js"
 CSS_DIRECTORY = "./css"
 
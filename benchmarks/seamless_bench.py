@@ -0,0 +1,283 @@
+import argparse
+import importlib
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import types
+
+import numpy as np
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+package = types.ModuleType("skbundle")
+package.__path__ = [ROOT]
+sys.modules.setdefault("skbundle", package)
+SeamlessTexture = importlib.import_module("skbundle.SeamlessTexture").SeamlessTexture
+TorchSeamlessEngine = importlib.import_module("skbundle.seamless_torch").TorchSeamlessEngine
+PeakMemory = importlib.import_module("skbundle.skb_profiler").PeakMemory
+
+GENERATE_DEFAULTS = dict(tile_size=512, overlap=64, pattern_type="simple", interpolation="bilinear", repeat_count=1,
+                         texture_direction="horizontal", detail_level=1.0, edge_padding=0, edge_blur=0.0, edge_fade=0.0,
+                         light_equalization=0.0, gradient_removal=0.0, color_correction=False,
+                         color_correction_strength=0.5, color_correction_clip_limit=0.03)
+
+STAGES = {
+    "simple_seamless": lambda s, image, overlap, repeat: s.simple_seamless(image, overlap),
+    "mirror_seamless": lambda s, image, overlap, repeat: s.mirror_seamless(image, overlap),
+    "rotate_seamless": lambda s, image, overlap, repeat: s.rotate_seamless(image, overlap),
+    "min_cut_seamless": lambda s, image, overlap, repeat: s.min_cut_seamless(image, overlap),
+    "apply_edge_blur": lambda s, image, overlap, repeat: s.apply_edge_blur(image, 0.4),
+    "apply_edge_fade": lambda s, image, overlap, repeat: s.apply_edge_fade(image, 0.5),
+    "apply_light_equalization": lambda s, image, overlap, repeat: s.apply_light_equalization(image, 0.5),
+    "apply_gradient_removal": lambda s, image, overlap, repeat: s.apply_gradient_removal(image, 0.6),
+    "apply_color_correction": lambda s, image, overlap, repeat: s.apply_color_correction(image, 0.5, 0.03),
+    "adjust_detail": lambda s, image, overlap, repeat: s.adjust_detail(image, 1.5),
+    "repeat_texture": lambda s, image, overlap, repeat: s.repeat_texture(image, repeat),
+}
+PATTERN_STAGES = ("simple_seamless", "mirror_seamless", "rotate_seamless", "min_cut_seamless")
+
+GOLDEN_VARIANTS = {
+    "default": {},
+    "mirror": dict(pattern_type="mirror"),
+    "rotate": dict(pattern_type="rotate"),
+    "detail": dict(detail_level=1.5, repeat_count=2),
+    "edge_blur": dict(edge_blur=40.0),
+    "edge_fade": dict(edge_fade=50.0),
+    "gradient_removal": dict(gradient_removal=60.0),
+    "light_equalization": dict(light_equalization=50.0),
+    "lab_fused": dict(gradient_removal=60.0, light_equalization=50.0, fuse_lab_stages=True),
+    "color_correction": dict(color_correction=True),
+    "vertical_padded": dict(edge_padding=8, texture_direction="vertical", repeat_count=2),
+    "diagonal_bicubic": dict(texture_direction="diagonal", interpolation="bicubic", repeat_count=3),
+    "nearest": dict(interpolation="nearest", overlap=40),
+    "auto_overlap": dict(auto_overlap=True),
+    "min_cut": dict(pattern_type="min_cut"),
+    "min_cut_feather": dict(pattern_type="min_cut", cut_feather=6, repeat_count=2),
+    "wang": dict(repeat_mode="wang", repeat_count=3, wang_seed=7),
+    "mipmaps": dict(mipmaps=True, mip_min_size=4, repeat_count=2),
+    "edge_map": dict(output_edge_map=True),
+}
+
+
+def make_image(batch, h, w, seed=0):
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:h, 0:w] / max(h, w)
+    base = np.stack([np.sin(12 * xx + k) * 0.3 + 0.5 + 0.2 * np.cos(9 * yy + k) for k in range(3)], -1)
+    images = [np.clip(base + 0.08 * rng.standard_normal((h, w, 3)), 0, 1) for _ in range(batch)]
+    return torch.from_numpy(np.stack(images).astype(np.float32))
+
+
+def measure(fn, runs):
+    fn()
+    times = []
+    with PeakMemory() as memory:
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    return {"wall_s": min(times), "peak_mb": round(memory.peak_mb, 2), "memory": memory.source}
+
+
+def engine_for(name):
+    return TorchSeamlessEngine() if name == "torch" else SeamlessTexture()
+
+
+def benchmark_cases(args):
+    for size, engine in itertools.product(args.sizes, args.engines):
+        stages = engine_for(engine)
+        image = stages.to_batch(make_image(args.batch, size, size))
+        for stage in STAGES:
+            if stage in PATTERN_STAGES:
+                for overlap in args.overlaps:
+                    yield f"stage/{engine}/{stage}/{size}/o{overlap}", lambda st=stage, o=overlap: STAGES[st](stages, image, o, 1)
+            elif stage == "repeat_texture":
+                for repeat in args.repeats:
+                    yield f"stage/{engine}/{stage}/{size}/r{repeat}", lambda r=repeat: STAGES["repeat_texture"](stages, image, 0, r)
+            else:
+                yield f"stage/{engine}/{stage}/{size}", lambda st=stage: STAGES[st](stages, image, 0, 1)
+
+        node = SeamlessTexture()
+        source = make_image(args.batch, size, size)
+        for overlap, pattern, repeat in itertools.product(args.overlaps, args.patterns, args.repeats):
+            params = dict(GENERATE_DEFAULTS, overlap=overlap, pattern_type=pattern, repeat_count=repeat, engine=engine)
+            yield f"generate/{engine}/{pattern}/{size}/o{overlap}/r{repeat}", lambda p=params: node.generate(source, **p)
+
+
+def run_benchmarks(args):
+    results = {}
+    for name, fn in benchmark_cases(args):
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, args.runs)
+        print(f"{name:60s} {results[name]['wall_s'] * 1000:10.1f} ms {results[name]['peak_mb']:10.1f} MB", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold, memory_threshold, min_seconds):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["wall_s"] > previous["wall_s"] * (1 + threshold) and current["wall_s"] - previous["wall_s"] > min_seconds:
+            regressions.append(f"{name}: wall {previous['wall_s']:.4f}s -> {current['wall_s']:.4f}s")
+        if previous.get("memory") == current["memory"] and current["peak_mb"] > max(previous["peak_mb"], 1.0) * (1 + memory_threshold):
+            regressions.append(f"{name}: peak {previous['peak_mb']:.1f}MB -> {current['peak_mb']:.1f}MB")
+    return regressions
+
+
+def golden_outputs(engine):
+    node = SeamlessTexture()
+    image = make_image(2, 96, 128, seed=1)
+    outputs = {}
+    for name, variant in GOLDEN_VARIANTS.items():
+        params = dict(GENERATE_DEFAULTS, tile_size=256, overlap=16)
+        params.update(variant)
+        for index, output in enumerate(node.generate(image, engine=engine, **params)):
+            if isinstance(output, list):
+                outputs.update((f"{name}/{index}/{level}", np.asarray(item)) for level, item in enumerate(output))
+            else:
+                outputs[f"{name}/{index}"] = np.asarray(output)
+    return outputs
+
+
+def check_golden(path, engines, atol, outlier_fraction, update):
+    if update or not os.path.exists(path):
+        np.savez_compressed(path, **golden_outputs("numpy"))
+        print(f"wrote golden outputs to {path}")
+    golden = np.load(path)
+    failures = []
+    for engine in engines:
+        for name, output in golden_outputs(engine).items():
+            if name not in golden.files:
+                failures.append(f"{engine} {name}: missing from golden file")
+                continue
+            expected = golden[name]
+            if expected.shape != output.shape:
+                failures.append(f"{engine} {name}: shape {output.shape} != {expected.shape}")
+                continue
+            error = np.abs(output - expected)
+            outliers = float((error > atol).mean())
+            passed = float(error.mean()) <= atol and outliers <= outlier_fraction
+            print(f"golden {engine:6s} {name:24s} max {error.max():.2e} mean {error.mean():.2e} "
+                  f"over atol {outliers:.2e} {'ok' if passed else 'FAIL'}")
+            if not passed:
+                failures.append(f"{engine} {name}: mean err {error.mean():.2e}, {outliers:.2e} of values over {atol:.0e}")
+    return failures
+
+
+class DtypeAudit:
+    def __init__(self, min_elements):
+        self.min_elements = min_elements
+        self.findings = {}
+
+    def _check(self, frame, name, value):
+        if isinstance(value, np.ndarray) and value.dtype == np.float64:
+            elements = value.size
+        elif isinstance(value, torch.Tensor) and value.dtype == torch.float64:
+            elements = value.numel()
+        else:
+            return
+        if elements >= self.min_elements:
+            code = frame.f_code
+            location = f"{os.path.relpath(code.co_filename, ROOT)}:{code.co_name}:{name}"
+            self.findings[location] = max(self.findings.get(location, 0), elements)
+
+    def _profile(self, frame, event, arg):
+        if event != "return" or not frame.f_code.co_filename.startswith(ROOT) or frame.f_code.co_filename.startswith(HERE):
+            return
+        for name, value in frame.f_locals.items():
+            self._check(frame, name, value)
+        values = arg if isinstance(arg, tuple) else (arg,)
+        for value in values:
+            self._check(frame, "<return>", value)
+
+    def run(self, fn):
+        sys.setprofile(self._profile)
+        try:
+            fn()
+        finally:
+            sys.setprofile(None)
+
+
+def audit_dtypes(engines, size=160):
+    image = make_image(1, size, size)
+    audit = DtypeAudit(min_elements=size * size // 4)
+    for engine in engines:
+        for name, variant in GOLDEN_VARIANTS.items():
+            params = dict(GENERATE_DEFAULTS, tile_size=size, overlap=16)
+            params.update(variant)
+            # sys.setprofile only sees the calling thread, so keep pool work on it.
+            audit.run(lambda: SeamlessTexture().generate(image, engine=engine, max_workers=1, **params))
+
+    paint_pro = importlib.import_module("skbundle.PaintPro")
+    overlay, mask = torch.rand(size // 2, size // 2, 4), torch.rand(size // 2, size // 2)
+    audit.run(lambda: paint_pro.composite(make_image(2, size, size), overlay, mask))
+
+    for location, elements in sorted(audit.findings.items()):
+        print(f"float64 array of {elements} elements in {location}")
+    return [f"float64 on the hot path: {location}" for location in audit.findings]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and equivalence checks for SeamlessTexture")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024, 4096])
+    parser.add_argument("--overlaps", type=int, nargs="+", default=[32, 128])
+    parser.add_argument("--patterns", nargs="+", default=["simple", "mirror", "rotate", "min_cut"])
+    parser.add_argument("--repeats", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--engines", nargs="+", default=["numpy", "torch"])
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--filter", default="")
+    parser.add_argument("--baseline", default=os.path.join(HERE, "baseline.json"))
+    parser.add_argument("--golden", default=os.path.join(HERE, "golden.npz"))
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--memory-threshold", type=float, default=0.2)
+    parser.add_argument("--min-seconds", type=float, default=0.005)
+    parser.add_argument("--atol", type=float, default=2e-4)
+    parser.add_argument("--outlier-fraction", type=float, default=1e-3)
+    parser.add_argument("--update", action="store_true")
+    parser.add_argument("--skip-bench", action="store_true")
+    parser.add_argument("--skip-golden", action="store_true")
+    parser.add_argument("--skip-audit", action="store_true")
+    args = parser.parse_args()
+
+    torch.set_grad_enabled(False)
+    failures = []
+
+    if not args.skip_audit:
+        failures += audit_dtypes(args.engines)
+
+    if not args.skip_golden:
+        failures += check_golden(args.golden, args.engines, args.atol, args.outlier_fraction, args.update)
+
+    if not args.skip_bench:
+        results = run_benchmarks(args)
+        if args.update or not os.path.exists(args.baseline):
+            baseline = {}
+            if os.path.exists(args.baseline):
+                with open(args.baseline) as f:
+                    baseline = json.load(f).get("results", {})
+            baseline.update(results)
+            meta = {"python": platform.python_version(), "torch": torch.__version__, "numpy": np.__version__,
+                    "machine": platform.machine(), "threads": torch.get_num_threads()}
+            with open(args.baseline, "w") as f:
+                json.dump({"meta": meta, "results": baseline}, f, indent=2, sort_keys=True)
+            print(f"wrote baseline to {args.baseline}")
+        else:
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+            failures += compare(results, baseline, args.threshold, args.memory_threshold, args.min_seconds)
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import base64
+import hashlib
+import os
+import struct
+from io import BytesIO
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .skb_lru import ByteLRU
+
+DEFAULT_MAX_MB = 512
+MASK_HEADER = struct.Struct("<4sB3xIII")
+MASK_MAGIC = b"SKBM"
+MASK_RAW = 0
+MASK_BINARY_RLE = 1
+MASK_RLE = 2
+
+
+def payload_key(payload, *extra):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(payload.encode() if isinstance(payload, str) else payload)
+    digest.update(repr(extra).encode())
+    return digest.hexdigest()
+
+
+def parse_data_url(url):
+    header, separator, data = url.partition(",")
+    if not separator or not header.startswith("data:") or not header.endswith(";base64"):
+        raise ValueError("Expected a base64 data URL")
+    return header[5:-7], base64.b64decode(data)
+
+
+def decode_mask(data):
+    if len(data) < MASK_HEADER.size:
+        raise ValueError("Truncated SKB mask payload")
+    magic, kind, width, height, count = MASK_HEADER.unpack_from(data)
+    if magic != MASK_MAGIC:
+        raise ValueError("Not an SKB mask payload")
+    if Image.MAX_IMAGE_PIXELS and width * height > Image.MAX_IMAGE_PIXELS:
+        raise ValueError(f"Mask size {width}x{height} exceeds the {Image.MAX_IMAGE_PIXELS} pixel limit")
+    body = memoryview(data)[MASK_HEADER.size:]
+    if kind == MASK_RAW:
+        return np.frombuffer(body, np.uint8, width * height).reshape(height, width).copy()
+    lengths = np.frombuffer(body, "<u4", count)
+    if int(lengths.sum(dtype=np.int64)) != width * height:
+        raise ValueError("Mask runs do not cover the mask")
+    if kind == MASK_BINARY_RLE:
+        values = np.zeros(count, np.uint8)
+        values[1::2] = 255
+    elif kind == MASK_RLE:
+        values = np.frombuffer(body, np.uint8, count, offset=lengths.nbytes)
+    else:
+        raise ValueError(f"Unknown mask encoding {kind}")
+    return np.repeat(values, lengths).reshape(height, width)
+
+
+def decode_array(data, mode="RGBA"):
+    if data[:len(MASK_MAGIC)] == MASK_MAGIC:
+        if mode != "L":
+            raise ValueError(f"Mask payloads cannot be decoded as {mode}")
+        return decode_mask(data)
+    with Image.open(BytesIO(data)) as image:
+        return np.array(image.convert(mode), dtype=np.uint8)
+
+
+def to_tensor(array):
+    return torch.from_numpy(array).float().div_(255.0)
+
+
+def decode_image(data, mode="RGBA"):
+    return to_tensor(decode_array(data, mode))
+
+
+def tensor_nbytes(value):
+    if torch.is_tensor(value):
+        return value.numel() * value.element_size()
+    return sum(tensor_nbytes(item) for item in value)
+
+
+CANVAS_CACHE = ByteLRU(int(os.environ.get("SKB_CANVAS_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def load_data_url(url, mode="RGBA"):
+    return CANVAS_CACHE.get_or_build(payload_key(url, mode), lambda: decode_image(parse_data_url(url)[1], mode), tensor_nbytes)
+
+
+def register_routes():
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except ImportError:
+        return
+
+    @PromptServer.instance.routes.get("/skb/canvas_cache")
+    async def get_canvas_cache(request):
+        stats = CANVAS_CACHE.stats()
+        if request.query.get("clear") in ("1", "true"):
+            CANVAS_CACHE.clear()
+        return web.json_response(stats)
@@ -126,6 +126,163 @@ function imageDataToUrl(data) {
     }
 }
 
+function canvasToBlob(canvas) {
+    return new Promise((resolve, reject) => {
+        canvas.toBlob((blob) => blob ? resolve(blob) : reject(new Error("Canvas encoding failed")), "image/png");
+    });
+}
+
+const MASK_MAGIC = [0x53, 0x4b, 0x42, 0x4d];
+const MASK_HEADER_SIZE = 20;
+const MASK_RAW = 0;
+const MASK_BINARY_RLE = 1;
+const MASK_RLE = 2;
+
+function encodeMask(pixels, width, rect) {
+    const count = rect.w * rect.h;
+    const values = new Uint8Array(count);
+    let binary = true;
+    let i = 0;
+    for (let y = rect.y; y < rect.y + rect.h; y++) {
+        const row = y * width;
+        for (let x = rect.x; x < rect.x + rect.w; x++) {
+            const p = pixels[row + x];
+            const v = ((p & 0xff) * 19595 + ((p >>> 8) & 0xff) * 38470 + ((p >>> 16) & 0xff) * 7471 + 0x8000) >>> 16;
+            values[i++] = v;
+            if (v !== 0 && v !== 255) binary = false;
+        }
+    }
+    const lengths = [];
+    const runValues = [];
+    if (binary && values[0] === 255) {
+        lengths.push(0);
+        runValues.push(0);
+    }
+    let start = 0;
+    for (let j = 1; j <= count; j++) {
+        if (j === count || values[j] !== values[start]) {
+            lengths.push(j - start);
+            runValues.push(values[start]);
+            start = j;
+        }
+    }
+    let kind = MASK_RAW;
+    let size = count;
+    if (binary && lengths.length * 4 < count) {
+        kind = MASK_BINARY_RLE;
+        size = lengths.length * 4;
+    } else if (lengths.length * 5 < count) {
+        kind = MASK_RLE;
+        size = lengths.length * 5;
+    }
+    const buffer = new ArrayBuffer(MASK_HEADER_SIZE + size);
+    const view = new DataView(buffer);
+    MASK_MAGIC.forEach((byte, k) => view.setUint8(k, byte));
+    view.setUint8(4, kind);
+    view.setUint32(8, rect.w, true);
+    view.setUint32(12, rect.h, true);
+    view.setUint32(16, kind === MASK_RAW ? count : lengths.length, true);
+    if (kind === MASK_RAW) {
+        new Uint8Array(buffer, MASK_HEADER_SIZE).set(values);
+    } else {
+        lengths.forEach((length, k) => view.setUint32(MASK_HEADER_SIZE + k * 4, length, true));
+        if (kind === MASK_RLE) {
+            new Uint8Array(buffer, MASK_HEADER_SIZE + lengths.length * 4).set(runValues);
+        }
+    }
+    return new Blob([buffer], { type: "application/octet-stream" });
+}
+
+async function blobToDataUrl(blob) {
+    const bytes = new Uint8Array(await blob.arrayBuffer());
+    let binary = "";
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+        binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return `data:${blob.type};base64,` + btoa(binary);
+}
+
+async function uploadCanvasLayers(imageCanvas, mask) {
+    const image = await canvasToBlob(imageCanvas);
+    const body = new FormData();
+    body.append("image", image, "image.png");
+    body.append("mask", mask, "mask.skbm");
+    const response = await api.fetchApi("/skb/paintpro/layers", { method: "POST", body });
+    if (!response.ok) {
+        throw new Error(`Layer upload failed with status ${response.status}`);
+    }
+    return { ...(await response.json()), depth: 0 };
+}
+
+function layerSnapshot(source, width, height) {
+    const canvas = document.createElement('canvas');
+    canvas.width = width;
+    canvas.height = height;
+    const ctx = canvas.getContext('2d', { willReadFrequently: true, alpha: true });
+    ctx.drawImage(source, 0, 0, width, height);
+    return { canvas, pixels: new Uint32Array(ctx.getImageData(0, 0, width, height).data.buffer) };
+}
+
+function tileChanged(previous, current, width, x0, y0, x1, y1) {
+    for (let y = y0; y < y1; y++) {
+        const row = y * width;
+        for (let i = row + x0; i < row + x1; i++) {
+            if (previous[i] !== current[i]) return true;
+        }
+    }
+    return false;
+}
+
+function dirtyRects(previous, current, width, height) {
+    const tile = CANVAS_CONFIG.PATCH_TILE;
+    const rects = [];
+    for (let y0 = 0; y0 < height; y0 += tile) {
+        const y1 = Math.min(height, y0 + tile);
+        let start = -1;
+        for (let x0 = 0; x0 < width + tile; x0 += tile) {
+            const dirty = x0 < width && tileChanged(previous, current, width, x0, y0, Math.min(width, x0 + tile), y1);
+            if (dirty && start < 0) {
+                start = x0;
+            } else if (!dirty && start >= 0) {
+                rects.push({ x: start, y: y0, w: Math.min(width, x0) - start, h: y1 - y0 });
+                start = -1;
+            }
+        }
+    }
+    return rects;
+}
+
+async function encodeRect(canvas, rect) {
+    const tile = document.createElement('canvas');
+    tile.width = rect.w;
+    tile.height = rect.h;
+    tile.getContext('2d').drawImage(canvas, rect.x, rect.y, rect.w, rect.h, 0, 0, rect.w, rect.h);
+    try {
+        return await canvasToBlob(tile);
+    } finally {
+        tile.remove();
+    }
+}
+
+async function patchCanvasLayers(nodeId, base, patches) {
+    const body = new FormData();
+    const meta = {
+        node: String(nodeId),
+        base,
+        patches: patches.map((patch, i) => ({ layer: patch.layer, x: patch.x, y: patch.y, part: `p${i}` }))
+    };
+    body.append("meta", JSON.stringify(meta));
+    patches.forEach((patch, i) => body.append(`p${i}`, patch.blob, `p${i}.png`));
+    const response = await api.fetchApi("/skb/paintpro/patch", { method: "POST", body });
+    if (response.status === 409) {
+        return null;
+    }
+    if (!response.ok) {
+        throw new Error(`Layer patch failed with status ${response.status}`);
+    }
+    return await response.json();
+}
+
 app.registerExtension({
     name: "Comfy.PaintPro",
     async beforeRegisterNodeDef(nodeType, nodeData, app) {
@@ -2165,7 +2322,6 @@ app.registerExtension({
             });
         };
         nodeType.prototype.updateCanvasWidget = function() {
-            const tempCanvas = document.createElement('canvas');
             let width = this.drawingCanvas.width;
             let height = this.drawingCanvas.height;
             const maxDimension = CANVAS_CONFIG.MAX_DIMENSION; 
@@ -2174,51 +2330,74 @@ app.registerExtension({
                 width = Math.floor(width * scale);
                 height = Math.floor(height * scale);
             }
-            tempCanvas.width = width;
-            tempCanvas.height = height;
-            const tempCtx = tempCanvas.getContext('2d', {
-                willReadFrequently: true,
-                alpha: true
-            });
-            tempCtx.drawImage(this.drawingCanvas, 0, 0, width, height);
-            const maskCanvas = document.createElement('canvas');
-            maskCanvas.width = width;
-            maskCanvas.height = height;
-            const maskCtx = maskCanvas.getContext('2d', {
-                willReadFrequently: true,
-                alpha: true
-            });
-            maskCtx.drawImage(this.maskCanvas, 0, 0, width, height);
-            const dataToSend = {
-                image: tempCanvas.toDataURL("image/png"), 
-                mask: maskCanvas.toDataURL("image/png")   
+            const sync = (this._canvasSyncId || 0) + 1;
+            this._canvasSyncId = sync;
+            const previous = this._canvasUpload || Promise.resolve();
+            this._canvasUpload = previous
+                .then(() => sync === this._canvasSyncId ? this._syncCanvasLayers(width, height) : undefined)
+                .then((value) => {
+                    if (value === undefined || sync !== this._canvasSyncId) return;
+                    if(this.internalCanvasImageWidget) {
+                        this.internalCanvasImageWidget.value = value;
+                    } else {
+                        console.error("[PaintPro updateCanvasWidget] internalCanvasImageWidget reference not found!");
+                    }
+                })
+                .catch((e) => console.error("[PaintPro updateCanvasWidget] Canvas sync failed:", e));
+            return this._canvasUpload;
+        };
+        nodeType.prototype._syncCanvasLayers = async function(width, height) {
+            const layers = {
+                image: layerSnapshot(this.drawingCanvas, width, height),
+                mask: layerSnapshot(this.maskCanvas, width, height)
             };
-            const jsonString = JSON.stringify(dataToSend);
-            const dataSizeMB = (jsonString.length * 2) / (1024 * 1024);
-            if (dataSizeMB > 1) {
-                if (dataSizeMB > 5) {
-                    const reducedWidth = Math.floor(width * 0.5);
-                    const reducedHeight = Math.floor(height * 0.5);
-                    tempCtx.clearRect(0, 0, width, height);
-                    maskCtx.clearRect(0, 0, width, height);
-                    tempCanvas.width = reducedWidth;
-                    tempCanvas.height = reducedHeight;
-                    maskCanvas.width = reducedWidth;
-                    maskCanvas.height = reducedHeight;
-                    tempCtx.drawImage(this.drawingCanvas, 0, 0, reducedWidth, reducedHeight);
-                    maskCtx.drawImage(this.maskCanvas, 0, 0, reducedWidth, reducedHeight);
-                    dataToSend.image = tempCanvas.toDataURL("image/jpeg", 0.3);
-                    dataToSend.mask = maskCanvas.toDataURL("image/jpeg", 0.3);
+            try {
+                const synced = this._syncedLayers;
+                let result = null;
+                if (synced && synced.width === width && synced.height === height && synced.depth < CANVAS_CONFIG.MAX_PATCH_DEPTH) {
+                    const patches = [];
+                    let area = 0;
+                    for (const layer of ["image", "mask"]) {
+                        for (const rect of dirtyRects(synced[layer], layers[layer].pixels, width, height)) {
+                            patches.push({ layer, ...rect });
+                            area += rect.w * rect.h;
+                        }
+                    }
+                    if (patches.length === 0) {
+                        result = synced;
+                    } else if (area <= width * height * CANVAS_CONFIG.MAX_PATCH_FRACTION) {
+                        await Promise.all(patches.map(async (patch) => {
+                            patch.blob = patch.layer === "mask"
+                                ? encodeMask(layers.mask.pixels, width, patch)
+                                : await encodeRect(layers.image.canvas, patch);
+                        }));
+                        result = await patchCanvasLayers(this.id, synced.reference, patches);
+                    }
                 }
+                if (!result) {
+                    result = await uploadCanvasLayers(layers.image.canvas, encodeMask(layers.mask.pixels, width, { x: 0, y: 0, w: width, h: height }));
+                }
+                this._syncedLayers = {
+                    width,
+                    height,
+                    reference: result.reference,
+                    depth: result.depth,
+                    image: layers.image.pixels,
+                    mask: layers.mask.pixels
+                };
+                return result.reference;
+            } catch (e) {
+                this._syncedLayers = null;
+                console.warn("[PaintPro updateCanvasWidget] Layer upload failed, sending inline data instead:", e);
+                const dataToSend = {
+                    image: layers.image.canvas.toDataURL("image/png"),
+                    mask: await blobToDataUrl(encodeMask(layers.mask.pixels, width, { x: 0, y: 0, w: width, h: height }))
+                };
+                return "data:application/json;base64," + btoa(JSON.stringify(dataToSend));
+            } finally {
+                layers.image.canvas.remove();
+                layers.mask.canvas.remove();
             }
-            const finalDataString = "data:application/json;base64," + btoa(JSON.stringify(dataToSend));
-            if(this.internalCanvasImageWidget) {
-                this.internalCanvasImageWidget.value = finalDataString;
-            } else {
-                console.error("[PaintPro updateCanvasWidget] internalCanvasImageWidget reference not found!");
-            }
-            tempCanvas.remove();
-            maskCanvas.remove();
         };
         nodeType.prototype.getTooltipText = function(toolValue) {
             const toolName = Object.keys(PAINT_TOOLS).find(key => PAINT_TOOLS[key] === toolValue);
@@ -2843,6 +3022,9 @@ app.registerExtension({
                 if (nodeData.class_type === "PaintPro") { 
                     const graphNode = app.graph.getNodeById(Number(nodeId)); 
                     if (graphNode && graphNode.internalCanvasImageWidget) {
+                        if (graphNode._canvasUpload) {
+                            await graphNode._canvasUpload;
+                        }
                         const canvasData = graphNode.internalCanvasImageWidget.value || "";
                         if (!nodeData.inputs) {
                             nodeData.inputs = {};
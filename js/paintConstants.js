@@ -21,6 +21,9 @@ export const DRAWING_DEFAULTS = {
 export const CANVAS_CONFIG = {
     DEFAULT_SIZE: 256,
     MAX_DIMENSION: 512,
+    PATCH_TILE: 64,
+    MAX_PATCH_DEPTH: 32,
+    MAX_PATCH_FRACTION: 0.5,
     MIN_WIDTH: 250,
     MIN_HEIGHT: 300,
     DEVICE_PIXEL_RATIO: typeof window !== 'undefined' ? (window.devicePixelRatio || 1) : 1
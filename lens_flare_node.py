@@ -1,8 +1,4 @@
-import torch
-import numpy as np
-from PIL import Image
-import base64
-from io import BytesIO
+from .canvas_payload import load_data_url
 
 class LensFlare:
     @classmethod
@@ -29,10 +25,7 @@ class LensFlare:
              rotation=0.0, glow_radius=1.0, rays_count=8, chromatic=False, blend_mode="screen", canvas_image=None):
         try:
             if canvas_image and canvas_image.startswith('data:image/png;base64,'):
-                image_data = base64.b64decode(canvas_image.split(',')[1])
-                pil_image = Image.open(BytesIO(image_data)).convert('RGB')
-                image_np = np.array(pil_image).astype(np.float32) / 255.0
-                result = torch.from_numpy(image_np).unsqueeze(0)
+                result = load_data_url(canvas_image, "RGB").unsqueeze(0).clone()
                 return (result,)
         except Exception as e:
             print(f"Error processing canvas image: {e}")
@@ -0,0 +1,293 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from .canvas_payload import decode_array, to_tensor
+from .skb_lru import ByteLRU
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "paintpro")
+DEFAULT_MAX_MB = 1024
+CANVAS_REFERENCE = "skb-canvas:"
+KEY_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+LAYER_MODES = (("image", "RGBA"), ("mask", "L"))
+DELTA_MAGIC = b"SKBDELTA"
+MAX_DEPTH = 32
+MAX_SESSIONS = 16
+
+
+def layer_key(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def canvas_reference(image_key, mask_key):
+    return f"{CANVAS_REFERENCE}{image_key}:{mask_key}"
+
+
+def parse_reference(value):
+    if not isinstance(value, str) or not value.startswith(CANVAS_REFERENCE):
+        return None
+    keys = value[len(CANVAS_REFERENCE):].split(":")
+    if len(keys) != 2 or not all(KEY_PATTERN.match(key) for key in keys):
+        return None
+    return tuple(keys)
+
+
+class LayerStore:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index = ByteLRU(max_bytes)
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if KEY_PATTERN.match(name) and os.path.isfile(path):
+                entries.append((os.path.getmtime(path), name, os.path.getsize(path)))
+        for _, name, size in sorted(entries):
+            self._remove(self.index.put(name, size, size))
+
+    def _remove(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    @property
+    def total_bytes(self):
+        return self.index.total_bytes
+
+    def get(self, key):
+        if not KEY_PATTERN.match(key):
+            return None
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.index.discard(key)
+            return None
+        self._remove(self.index.put(key, len(data), len(data)))
+        return data
+
+    def put(self, data):
+        key = layer_key(data)
+        path = os.path.join(self.directory, key)
+        if key in self.index and os.path.exists(path):
+            os.utime(path)
+        else:
+            staging = os.path.join(self.directory, f".{key}.{threading.get_ident()}")
+            with open(staging, "wb") as f:
+                f.write(data)
+            os.replace(staging, path)
+        self._remove(self.index.put(key, len(data), len(data)))
+        return key
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def layer_store():
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            directory = os.path.abspath(os.environ.get("SKB_PAINTPRO_DIR") or DEFAULT_STORE_DIR)
+            max_bytes = int(os.environ.get("SKB_PAINTPRO_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+            _STORE = LayerStore(directory, max_bytes)
+        return _STORE
+
+
+class LayerSessions:
+    def __init__(self, store, max_sessions=MAX_SESSIONS):
+        self.store = store
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._nodes = OrderedDict()
+
+    def _live(self, key):
+        with self._lock:
+            for layers in self._nodes.values():
+                for layer_key, array, depth in layers.values():
+                    if layer_key == key:
+                        return array.copy(), depth
+        return None
+
+    def _blob(self, key):
+        data = self.store.get(key)
+        if data is None:
+            raise KeyError(key)
+        return data
+
+    def _load(self, key, mode, limit=MAX_DEPTH):
+        live = self._live(key)
+        if live is not None:
+            return live
+        data = self._blob(key)
+        if not data.startswith(DELTA_MAGIC):
+            return decode_array(data, mode), 0
+        if limit <= 0:
+            raise ValueError(f"delta chain for {key} is deeper than {MAX_DEPTH}")
+        record = json.loads(data[len(DELTA_MAGIC):])
+        array, depth = self._load(record["base"], mode, limit - 1)
+        for x, y, patch_key in record["patches"]:
+            paste(array, x, y, decode_array(self._blob(patch_key), mode))
+        return array, depth + 1
+
+    def layers(self, reference):
+        keys = parse_reference(reference)
+        if keys is None:
+            raise KeyError(reference)
+        return tuple(to_tensor(self._load(key, mode)[0]) for key, (_, mode) in zip(keys, LAYER_MODES))
+
+    def apply(self, node, reference, patches, blobs):
+        keys = parse_reference(reference)
+        if keys is None:
+            raise KeyError(reference)
+        changes = {}
+        for key, (layer, mode) in zip(keys, LAYER_MODES):
+            decoded, entries = [], []
+            for patch in patches:
+                if patch["layer"] != layer:
+                    continue
+                blob = blobs.get(patch["part"])
+                if blob is None:
+                    raise ValueError(f"missing patch part {patch['part']!r}")
+                x, y = int(patch["x"]), int(patch["y"])
+                decoded.append((x, y, decode_array(blob, mode)))
+                entries.append([x, y, put_layer(self.store, blob)])
+            if decoded:
+                record = json.dumps({"base": key, "patches": entries}, separators=(",", ":"))
+                changes[layer] = (decoded, self.store.put(DELTA_MAGIC + record.encode()))
+
+        loaded = {}
+        while True:
+            with self._lock:
+                current = self._nodes.get(node, {})
+                missing = [(layer, key, mode) for key, (layer, mode) in zip(keys, LAYER_MODES)
+                           if layer not in loaded and not (layer in current and current[layer][0] == key)]
+                if not missing:
+                    updated = {}
+                    for key, (layer, _) in zip(keys, LAYER_MODES):
+                        array, depth = loaded[layer] if layer in loaded else current[layer][1:]
+                        if layer in changes and depth >= MAX_DEPTH:
+                            raise KeyError(key)
+                        updated[layer] = (key, array, depth)
+                    for layer, (decoded, key) in changes.items():
+                        array, depth = updated[layer][1:]
+                        for x, y, patch in decoded:
+                            paste(array, x, y, patch)
+                        updated[layer] = (key, array, depth + 1)
+                    self._nodes.pop(node, None)
+                    self._nodes[node] = updated
+                    while len(self._nodes) > self.max_sessions:
+                        self._nodes.popitem(last=False)
+                    break
+            for layer, key, mode in missing:
+                loaded[layer] = self._load(key, mode)
+        return {
+            **{layer: updated[layer][0] for layer, _ in LAYER_MODES},
+            "reference": canvas_reference(updated["image"][0], updated["mask"][0]),
+            "depth": max(entry[2] for entry in updated.values()),
+        }
+
+
+def paste(array, x, y, patch):
+    h, w = array.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + patch.shape[1], w), min(y + patch.shape[0], h)
+    if x1 > x0 and y1 > y0:
+        array[y0:y1, x0:x1] = patch[y0 - y:y1 - y, x0 - x:x1 - x]
+
+
+def put_layer(store, data):
+    if data.startswith(DELTA_MAGIC):
+        raise ValueError("layer data cannot start with the delta record marker")
+    return store.put(data)
+
+
+_SESSIONS = None
+
+
+def layer_sessions():
+    global _SESSIONS
+    store = layer_store()
+    with _STORE_LOCK:
+        if _SESSIONS is None:
+            _SESSIONS = LayerSessions(store)
+        return _SESSIONS
+
+
+def load_layers(value):
+    try:
+        return layer_sessions().layers(value)
+    except KeyError:
+        logger.warning(f"PaintPro: canvas layers {value} are no longer in the layer store.")
+        return None
+
+
+def register_routes():
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except ImportError:
+        return
+
+    @PromptServer.instance.routes.post("/skb/paintpro/layers")
+    async def upload_layers(request):
+        store = layer_store()
+        loop = asyncio.get_running_loop()
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            keys = {}
+            while (part := await reader.next()) is not None:
+                if part.name in ("image", "mask"):
+                    data = await part.read()
+                    if data:
+                        keys[part.name] = bytes(data)
+            if set(keys) != {"image", "mask"}:
+                return web.json_response({"error": "expected 'image' and 'mask' parts"}, status=400)
+            try:
+                for name, data in keys.items():
+                    keys[name] = await loop.run_in_executor(None, put_layer, store, data)
+            except ValueError as e:
+                return web.json_response({"error": str(e)}, status=400)
+            return web.json_response({**keys, "reference": canvas_reference(keys["image"], keys["mask"])})
+        data = await request.read()
+        if not data:
+            return web.json_response({"error": "empty layer"}, status=400)
+        try:
+            return web.json_response({"key": await loop.run_in_executor(None, put_layer, store, data)})
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+    @PromptServer.instance.routes.post("/skb/paintpro/patch")
+    async def patch_layers(request):
+        reader = await request.multipart()
+        meta, blobs = None, {}
+        while (part := await reader.next()) is not None:
+            if part.name == "meta":
+                meta = json.loads(await part.text())
+            else:
+                blobs[part.name] = bytes(await part.read())
+        if not isinstance(meta, dict) or not {"node", "base", "patches"} <= meta.keys():
+            return web.json_response({"error": "expected a 'meta' part with node, base and patches"}, status=400)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, layer_sessions().apply, str(meta["node"]), meta["base"], meta["patches"], blobs)
+            return web.json_response(result)
+        except KeyError:
+            return web.json_response({"error": "base layers unavailable, upload the full canvas"}, status=409)
+        except (TypeError, ValueError, OSError) as e:
+            return web.json_response({"error": str(e)}, status=400)
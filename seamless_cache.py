@@ -0,0 +1,111 @@
+import hashlib
+import os
+import shutil
+import threading
+
+import numpy as np
+import torch
+
+from .skb_lru import ByteLRU
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "seamless")
+DEFAULT_MAX_MB = 2048
+# Bump whenever a change alters rendered output, so stale on-disk results are not served.
+CACHE_VERSION = 3
+
+
+def content_key(array, *extra):
+    if torch.is_tensor(array):
+        array = array.detach().cpu().numpy()
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{array.dtype}{array.shape}".encode())
+    digest.update(array.data)
+    digest.update(repr(extra).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index = ByteLRU(max_bytes)
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(path) or name.startswith("."):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), name, size))
+        for _, name, size in sorted(entries):
+            self._remove(self.index.put(name, size, size))
+
+    def _remove(self, names):
+        for name in names:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    @property
+    def total_bytes(self):
+        return self.index.total_bytes
+
+    def key(self, image, params):
+        return content_key(image, CACHE_VERSION, sorted(params.items()))
+
+    def get(self, key):
+        path = os.path.join(self.directory, key)
+        if self.index.get(key) is None:
+            return None
+        try:
+            os.utime(path)
+            outputs = {}
+            for name in sorted(os.listdir(path), key=lambda name: [int(part) for part in name[:-4].split(".")]):
+                index, _, level = name[:-4].partition(".")
+                array = np.load(os.path.join(path, name), mmap_mode="c")
+                value = array.item() if array.ndim == 0 else torch.from_numpy(array)
+                if level:
+                    outputs.setdefault(int(index), []).append(value)
+                else:
+                    outputs[int(index)] = value
+            return tuple(outputs[i] for i in range(len(outputs)))
+        except OSError:
+            self.index.discard(key)
+            return None
+
+    def put(self, key, outputs):
+        path = os.path.join(self.directory, key)
+        staging = os.path.join(self.directory, f".{key}.{threading.get_ident()}")
+        os.makedirs(staging, exist_ok=True)
+        for i, output in enumerate(outputs):
+            if isinstance(output, list):
+                for level, item in enumerate(output):
+                    np.save(os.path.join(staging, f"{i}.{level}.npy"), item.detach().cpu().numpy())
+            else:
+                array = output.detach().cpu().numpy() if torch.is_tensor(output) else np.asarray(output)
+                np.save(os.path.join(staging, f"{i}.npy"), array)
+        size = sum(os.path.getsize(os.path.join(staging, f)) for f in os.listdir(staging))
+
+        try:
+            os.replace(staging, path)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        self._remove(self.index.put(key, size, size))
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def result_cache(directory=""):
+    directory = os.path.abspath(directory or os.environ.get("SKB_CACHE_DIR") or DEFAULT_CACHE_DIR)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(directory)
+        if cache is None:
+            max_bytes = int(os.environ.get("SKB_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024
+            cache = _CACHES[directory] = ResultCache(directory, max_bytes)
+        return cache
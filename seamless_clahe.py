@@ -0,0 +1,131 @@
+import torch
+
+NR_OF_GRAY = 2 ** 14
+
+
+def _reflect_indices(size, before, after, device):
+    idx = torch.arange(-before, size + after, device=device)
+    if size == 1:
+        return torch.zeros_like(idx)
+    period = 2 * (size - 1)
+    idx = torch.remainder(idx, period)
+    return torch.where(idx >= size, period - idx, idx)
+
+
+def _to_bins(levels, index, bin_size):
+    b = levels.shape[0]
+    i_min = levels.view(b, -1).amin(dim=1, keepdim=True)
+    i_max = levels.view(b, -1).amax(dim=1, keepdim=True)
+    scale = (NR_OF_GRAY - 1) / torch.where(i_max > i_min, i_max - i_min, torch.ones_like(i_max))
+    codes = torch.arange(65536, dtype=torch.float32, device=levels.device)
+    lut = torch.round_((codes - i_min).mul_(scale)).div_(bin_size).floor_()
+    lut = lut.to(torch.uint8 if NR_OF_GRAY // bin_size < 256 else torch.int16)
+    index.copy_(levels)
+    if b > 1:
+        index += torch.arange(b, dtype=torch.int32, device=levels.device).view(b, 1, 1) * 65536
+    return lut.view(-1).index_select(0, index.view(-1)).view(levels.shape)
+
+
+def clip_histograms(hist, clip_limit):
+    nbins = hist.shape[-1]
+    positions = torch.arange(nbins, device=hist.device)
+
+    excess = (hist - clip_limit).clamp(min=0)
+    n_excess = excess.sum(dim=-1)
+    hist = hist.clamp(max=clip_limit)
+
+    bin_incr = n_excess // nbins
+    upper = (clip_limit - bin_incr)[:, None]
+    low_mask = hist < upper
+    n_excess = n_excess - low_mask.sum(dim=-1) * bin_incr
+    hist = hist + low_mask * bin_incr[:, None]
+
+    mid_mask = (hist >= upper) & (hist < clip_limit)
+    n_excess = n_excess + (hist * mid_mask).sum(dim=-1) - mid_mask.sum(dim=-1) * clip_limit
+    hist = torch.where(mid_mask, torch.full_like(hist, clip_limit), hist)
+
+    active = n_excess > 0
+    while bool(active.any()):
+        previous = n_excess.clone()
+        running = active.clone()
+        for index in range(nbins):
+            if not bool(running.any()):
+                break
+            under = hist < clip_limit
+            step = (under.sum(dim=-1) // n_excess.clamp(min=1)).clamp(min=1)
+            selected = under & running[:, None] & (positions >= index) & ((positions - index) % step[:, None] == 0)
+            hist = hist + selected
+            n_excess = n_excess - selected.sum(dim=-1)
+            running = running & (n_excess > 0)
+        active = (n_excess > 0) & (n_excess != previous)
+
+    return hist
+
+
+def equalize_adapthist(image, kernel_size=None, clip_limit=0.01, nbins=256):
+    if image.ndim == 2:
+        return equalize_adapthist(image[None], kernel_size, clip_limit, nbins)[0]
+
+    b, h, w = image.shape
+    device = image.device
+    float_dtype = image.dtype if image.dtype in (torch.float32, torch.float64) else torch.float32
+
+    if kernel_size is None:
+        kernel_size = (max(h // 8, 1), max(w // 8, 1))
+    elif isinstance(kernel_size, (int, float)):
+        kernel_size = (kernel_size, kernel_size)
+    kh, kw = (int(k) for k in kernel_size)
+
+    bin_size = 1 + NR_OF_GRAY // nbins
+    # One int32 index buffer and the float level buffer are reused through every full-size step;
+    # int64 indices and fresh allocations dominate the runtime at this size.
+    levels = image.to(torch.float32).mul(65535).round_().clamp_(0, 65535)
+    index = torch.empty(levels.shape, dtype=torch.int32, device=device)
+    bins = _to_bins(levels, index, bin_size)
+
+    nh, nw = -(-h // kh), -(-w // kw)
+    blocks = bins
+    if nh * kh != h:
+        blocks = blocks.index_select(1, _reflect_indices(h, 0, nh * kh - h, device))
+    if nw * kw != w:
+        blocks = blocks.index_select(2, _reflect_indices(w, 0, nw * kw - w, device))
+    blocks = blocks.view(b, nh, kh, nw, kw)
+    tile_ids = torch.arange(b * nh * nw, dtype=torch.int32, device=device).view(b, nh, 1, nw, 1) * nbins
+    codes = index.view(blocks.shape) if blocks.numel() == index.numel() else torch.empty(blocks.shape, dtype=torch.int32, device=device)
+    hist = torch.bincount(codes.copy_(blocks).add_(tile_ids).view(-1), minlength=b * nh * nw * nbins).view(b * nh * nw, nbins)
+
+    kernel_elements = kh * kw
+    if clip_limit > 0.0:
+        clim = max(int(clip_limit * kernel_elements), 1)
+    else:
+        clim = kernel_elements
+    hist = clip_histograms(hist, clim)
+
+    mapped = torch.cumsum(hist, dim=-1).to(torch.float64) * ((NR_OF_GRAY - 1) / kernel_elements)
+    mapped = mapped.clamp(max=NR_OF_GRAY - 1).floor().to(torch.float32).view(b, nh, nw, nbins)
+
+    # Blend the tile LUTs vertically once per image row, then each pixel only needs a left/right lookup.
+    fy = (torch.arange(h, device=device) + kh // 2) % kh / kh
+    rows = torch.empty((b, h, nw, nbins), device=device)
+    for block in range(nh + 1):
+        start, stop = max(block * kh - kh // 2, 0), min((block + 1) * kh - kh // 2, h)
+        if start < stop:
+            top, bottom = mapped[:, max(block - 1, 0), None], mapped[:, min(block, nh - 1), None]
+            torch.lerp(top, bottom, fy[start:stop].view(1, -1, 1, 1), out=rows[:, start:stop])
+    rows = rows.view(-1)
+
+    x = torch.arange(w, device=device) + kw // 2
+    block_x = torch.div(x, kw, rounding_mode="floor")
+    left = (block_x - 1).clamp(0, nw - 1)
+    right = block_x.clamp(max=nw - 1)
+    fx = (x % kw).to(torch.float32) / kw
+
+    offsets = torch.arange(b * h, dtype=torch.int32, device=device).view(b, h, 1) * (nw * nbins)
+    index.copy_(bins).add_(offsets).add_((left * nbins).to(torch.int32))
+    low = torch.index_select(rows, 0, index.view(-1), out=levels.view(-1)).view(b, h, w)
+    high = rows.index_select(0, index.add_(((right - left) * nbins).to(torch.int32)).view(-1)).view(b, h, w)
+
+    result = low.lerp_(high, fx).floor_().to(float_dtype)
+    r_min = result.amin(dim=(1, 2), keepdim=True)
+    r_max = result.amax(dim=(1, 2), keepdim=True)
+    return result.sub_(r_min).div_(torch.where(r_max > r_min, r_max - r_min, torch.ones_like(r_max)))
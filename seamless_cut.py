@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def min_cut_seam(errors):
+    b, n, width = errors.shape
+    cost = errors[:, 0].astype(np.float32)
+    steps = np.zeros((b, n, width), dtype=np.int8)
+    padded = np.full((b, width + 2), np.inf, dtype=np.float32)
+
+    for row in range(1, n):
+        padded[:, 1:-1] = cost
+        choices = np.stack((padded[:, :-2], padded[:, 1:-1], padded[:, 2:]))
+        step = choices.argmin(axis=0)
+        steps[:, row] = step - 1
+        cost = errors[:, row] + np.take_along_axis(choices, step[np.newaxis], axis=0)[0]
+
+    items = np.arange(b)
+    seams = np.empty((b, n), dtype=np.int64)
+    seams[:, -1] = cost.argmin(axis=1)
+    for row in range(n - 1, 0, -1):
+        seams[:, row - 1] = seams[:, row] + steps[items, row, seams[:, row]]
+    return seams
+
+
+def seam_alpha(seams, width, feather=0):
+    offset = np.arange(width, dtype=np.float32) - seams[..., np.newaxis]
+    if feather <= 0:
+        return (offset >= 0).astype(np.float32)
+    return np.clip(offset / feather + 0.5, 0, 1).astype(np.float32)
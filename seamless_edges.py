@@ -0,0 +1,35 @@
+import os
+
+import torch
+
+from .seamless_cache import content_key
+from .skb_lru import ByteLRU
+
+DEFAULT_MAX_MB = 256
+
+
+def _nbytes(edges):
+    if torch.is_tensor(edges):
+        return edges.numel() * edges.element_size()
+    return edges.nbytes
+
+
+class EdgeMapService:
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, max_entries=8):
+        self.cache = ByteLRU(max_bytes, max_entries)
+
+    def get(self, stages, image, sigma, memory_budget_mb=0, smooth=0, pad_mode=None):
+        def build():
+            edges = stages.edge_map(image, sigma, memory_budget_mb, smooth, pad_mode)
+            if hasattr(edges, "setflags"):
+                edges.setflags(write=False)
+            return edges
+
+        key = content_key(image, type(stages).__name__, float(sigma), smooth, pad_mode)
+        return self.cache.get_or_build(key, build, _nbytes)
+
+    def clear(self):
+        self.cache.clear()
+
+
+EDGE_MAPS = EdgeMapService(int(os.environ.get("SKB_EDGE_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
@@ -0,0 +1,80 @@
+import contextvars
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import torch
+
+_WORKERS = contextvars.ContextVar("skb_workers", default=1)
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def resolve_workers(max_workers):
+    if max_workers > 0:
+        return max_workers
+    return max(1, os.cpu_count() or 1)
+
+
+def check_interrupt():
+    model_management = sys.modules.get("comfy.model_management")
+    if model_management is not None:
+        model_management.throw_exception_if_processing_interrupted()
+
+
+def worker_count():
+    return _WORKERS.get()
+
+
+@contextmanager
+def worker_limit(max_workers):
+    token = _WORKERS.set(resolve_workers(max_workers))
+    try:
+        yield
+    finally:
+        _WORKERS.reset(token)
+
+
+@contextmanager
+def torch_threads_per_worker(workers):
+    threads = torch.get_num_threads()
+    torch.set_num_threads(max(1, threads // workers))
+    try:
+        yield
+    finally:
+        torch.set_num_threads(threads)
+
+
+def _submit(workers, calls):
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL[0] < workers:
+            if _POOL is not None:
+                _POOL[1].shutdown(wait=False)
+            _POOL = (workers, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="skb"))
+        return [_POOL[1].submit(*call) for call in calls]
+
+
+def _run_lane(fn, queue, results):
+    # Pool threads share one executor, so a nested fan-out could wait on itself.
+    _WORKERS.set(1)
+    while True:
+        try:
+            index, item = queue.popleft()
+        except IndexError:
+            return
+        results[index] = fn(item)
+
+
+def parallel_map(fn, items):
+    items = list(items)
+    workers = min(worker_count(), len(items))
+    if workers <= 1:
+        return [fn(item) for item in items]
+    queue, results = deque(enumerate(items)), [None] * len(items)
+    for future in _submit(workers, [(contextvars.copy_context().run, _run_lane, fn, queue, results) for _ in range(workers)]):
+        future.result()
+    return results
@@ -0,0 +1,104 @@
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+from .skb_lru import ByteLRU
+
+
+class ProfileMask:
+    def __init__(self, shape, terms, outer=np.multiply):
+        self.shape = shape
+        self.terms = terms
+        self.outer = outer
+        self.nbytes = sum(u.nbytes + v.nbytes for u, v in terms)
+
+    def region(self, rows=slice(None), cols=slice(None)):
+        result = None
+        for u, v in self.terms:
+            part = self.outer.outer(u[rows], v[cols])
+            result = part if result is None else result + part
+        return result
+
+
+class MaskCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=64):
+        self.cache = ByteLRU(max_bytes, max_entries)
+
+    def get(self, key, build):
+        def frozen():
+            mask = build()
+            for u, v in mask.terms:
+                u.setflags(write=False)
+                v.setflags(write=False)
+            return mask
+
+        return self.cache.get_or_build(key, frozen, lambda mask: mask.nbytes)
+
+    def clear(self):
+        self.cache.clear()
+
+
+MASK_CACHE = MaskCache()
+
+
+def sigmoid_transition(overlap):
+    x = np.linspace(-3, 3, overlap)
+    return 1 / (1 + np.exp(-x))
+
+
+def _blend_mask(h, w, overlap):
+    transition = sigmoid_transition(overlap)
+    strips, corners, centers = [], [], []
+    for size in (h + overlap * 2, w + overlap * 2):
+        strip = np.zeros(size)
+        strip[:overlap] = transition
+        strip[-overlap:] = transition
+        corner = strip.copy()
+        corner[-overlap:] = transition[::-1]
+        center = np.zeros(size)
+        center[overlap:-overlap] = 1
+        strips.append(strip)
+        corners.append(corner)
+        centers.append(center)
+
+    sigma = overlap / 4
+    smooth = lambda profile: gaussian_filter1d(profile, sigma).astype(np.float32)
+    terms = [
+        (smooth(corners[0]), smooth(corners[1])),
+        (smooth(strips[0]), smooth(centers[1])),
+        (smooth(centers[0]), smooth(strips[1])),
+    ]
+    return ProfileMask((h + overlap * 2, w + overlap * 2), terms)
+
+
+def _edge_blur_mask(h, w, blur_width):
+    i = np.arange(blur_width)
+    alpha = 1 - (1 / (1 + np.exp(-(i - blur_width / 2))))
+    profiles = []
+    for size in (h, w):
+        front = np.zeros(size)
+        front[:blur_width] = alpha
+        profiles.append(np.maximum(front, front[::-1]).astype(np.float32))
+    return ProfileMask((h, w), [tuple(profiles)], outer=np.maximum)
+
+
+def _edge_fade_mask(h, w, fade_width):
+    progress = np.arange(fade_width) / fade_width
+    alpha = progress * progress * (3 - 2 * progress)
+    profiles = []
+    for size in (h, w):
+        front = np.ones(size)
+        front[:fade_width] = alpha
+        profiles.append((front * front[::-1]).astype(np.float32))
+    return ProfileMask((h, w), [tuple(profiles)])
+
+
+def seamless_blend_mask(h, w, overlap):
+    return MASK_CACHE.get((h, w, overlap, "blend"), lambda: _blend_mask(h, w, overlap))
+
+
+def edge_blur_mask(h, w, blur_width):
+    return MASK_CACHE.get((h, w, blur_width, "edge_blur"), lambda: _edge_blur_mask(h, w, blur_width))
+
+
+def edge_fade_mask(h, w, fade_width):
+    return MASK_CACHE.get((h, w, fade_width, "edge_fade"), lambda: _edge_fade_mask(h, w, fade_width))
@@ -0,0 +1,170 @@
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+CUBIC_A = -0.75
+
+
+def _cubic_near(x):
+    return ((CUBIC_A + 2) * x - (CUBIC_A + 3)) * x * x + 1
+
+
+def _cubic_far(x):
+    return ((CUBIC_A * x - 5 * CUBIC_A) * x + 8 * CUBIC_A) * x - 4 * CUBIC_A
+
+
+def resample_taps(out_size, in_size, mode):
+    dst = np.arange(out_size, dtype=np.int64)
+
+    if mode == "nearest":
+        if out_size == in_size:
+            idx = dst
+        elif out_size == 2 * in_size:
+            idx = dst >> 1
+        else:
+            scale = np.float32(in_size) / np.float32(out_size)
+            idx = np.minimum(np.floor(dst.astype(np.float32) * scale).astype(np.int64), in_size - 1)
+        return idx[np.newaxis], np.ones((1, out_size), dtype=np.float32)
+
+    scale = np.float32(in_size) / np.float32(out_size)
+    src = scale * (dst.astype(np.float32) + np.float32(0.5)) - np.float32(0.5)
+
+    if mode == "bilinear":
+        src = np.maximum(src, np.float32(0))
+        i0 = np.minimum(np.floor(src).astype(np.int64), in_size - 1)
+        lam = np.clip(src - i0.astype(np.float32), 0, 1).astype(np.float32)
+        i1 = i0 + (i0 < in_size - 1)
+        return np.stack([i0, i1]), np.stack([1 - lam, lam])
+
+    if mode == "bicubic":
+        i0 = np.floor(src).astype(np.int64)
+        t = (src - i0.astype(np.float32)).astype(np.float32)
+        weights = np.stack([_cubic_far(t + 1), _cubic_near(t), _cubic_near(1 - t), _cubic_far(2 - t)]).astype(np.float32)
+        indices = np.stack([np.clip(i0 - 1 + k, 0, in_size - 1) for k in range(4)])
+        return indices, weights
+
+    raise ValueError(f"Unknown interpolation mode: {mode}")
+
+
+def periodic_taps(out_size, in_size):
+    scale = in_size / out_size
+    support = max(scale, 1.0)
+    center = (np.arange(out_size) + 0.5) * scale
+    reach = int(np.ceil(support))
+    src = np.floor(center)[np.newaxis] + np.arange(-reach - 1, reach + 1)[:, np.newaxis]
+    weights = np.maximum(0, 1 - np.abs(src + 0.5 - center) / support)
+    keep = weights.any(axis=1)
+    weights = weights[keep] / weights[keep].sum(axis=0)
+    return (src[keep] % in_size).astype(np.int64), weights.astype(np.float32)
+
+
+def resample_axis(x, dim, indices, weights):
+    shape = [1] * x.ndim
+    shape[dim] = -1
+    result = None
+    for idx, weight in zip(indices, weights):
+        term = x.index_select(dim, torch.from_numpy(np.ascontiguousarray(idx)).to(x.device))
+        if not np.all(weight == 1):
+            term = term * torch.from_numpy(np.ascontiguousarray(weight)).to(x).view(shape)
+        result = term if result is None else result + term
+    return result
+
+
+def mip_chain(image, min_size=1):
+    levels = [image]
+    h, w = image.shape[2:]
+    while max(h, w) // 2 >= max(min_size, 1):
+        next_h, next_w = max(1, h // 2), max(1, w // 2)
+        level = resample_axis(levels[-1], 3, *periodic_taps(next_w, w))
+        levels.append(resample_axis(level, 2, *periodic_taps(next_h, h)).contiguous())
+        h, w = next_h, next_w
+    return levels
+
+
+class TexturePlan:
+    ROTATIONS = {"horizontal": 0, "vertical": 1, "diagonal": 3}
+
+    def __init__(self, base_h, base_w, repeat_count=1, direction="horizontal", mirror=False, cells=None):
+        self.cells = cells
+        self.cell_h = base_h
+        self.cell_w = base_w
+        if cells is not None:
+            base_h, base_w, repeat_count = base_h * cells.shape[0], base_w * cells.shape[1], 1
+        self.base_h = base_h
+        self.base_w = base_w
+        self.mirror = mirror
+        self.pattern_h = base_h * 2 if mirror else base_h
+        self.pattern_w = base_w * 2 if mirror else base_w
+        self.rotation = self.ROTATIONS.get(direction, 0)
+        if self.rotation:
+            self.tile_h, self.tile_w = self.pattern_w, self.pattern_h
+        else:
+            self.tile_h, self.tile_w = self.pattern_h, self.pattern_w
+        self.height = self.tile_h * repeat_count
+        self.width = self.tile_w * repeat_count
+
+    def _unmirror(self, coords, size):
+        if not self.mirror:
+            return coords
+        return np.where(coords < size, coords, 2 * size - 1 - coords)
+
+    def axis_indices(self, coords, axis):
+        if axis == "y":
+            local = coords % self.tile_h
+            if self.rotation == 0:
+                return 2, self._unmirror(local, self.base_h)
+            if self.rotation == 1:
+                return 3, self._unmirror(self.pattern_w - 1 - local, self.base_w)
+            return 3, self._unmirror(local, self.base_w)
+
+        local = coords % self.tile_w
+        if self.rotation == 0:
+            return 3, self._unmirror(local, self.base_w)
+        if self.rotation == 1:
+            return 2, self._unmirror(local, self.base_h)
+        return 2, self._unmirror(self.pattern_h - 1 - local, self.base_h)
+
+    def resample(self, base, out_h, out_w, mode, rows=None):
+        if rows is None and self.cells is None and not self.mirror and (self.height, self.width) == (self.tile_h, self.tile_w):
+            if self.rotation:
+                base = torch.rot90(base, self.rotation, dims=(2, 3))
+            return F.interpolate(base, size=(out_h, out_w), mode=mode, align_corners=None if mode == "nearest" else False)
+
+        iy, wy = resample_taps(out_h, self.height, mode)
+        ix, wx = resample_taps(out_w, self.width, mode)
+        if rows is not None:
+            iy, wy = iy[:, rows[0]:rows[1]], wy[:, rows[0]:rows[1]]
+
+        dim_y, idx_y = self.axis_indices(iy, "y")
+        dim_x, idx_x = self.axis_indices(ix, "x")
+        if self.cells is not None:
+            return self.gather_cells(base, dim_y, idx_y, wy, idx_x, wx)
+
+        if rows is None:
+            result = resample_axis(base, dim_x, idx_x, wx)
+            result = resample_axis(result, dim_y, idx_y, wy)
+        else:
+            result = resample_axis(base, dim_y, idx_y, wy)
+            result = resample_axis(result, dim_x, idx_x, wx)
+        if self.rotation:
+            result = result.transpose(2, 3)
+        return result.contiguous()
+
+    def gather_cells(self, tiles, dim_y, idx_y, wy, idx_x, wx):
+        b, _, c = tiles.shape[:3]
+        texels = tiles.permute(1, 3, 4, 0, 2).reshape(-1, b * c)
+        out_h, out_w = idx_y.shape[1], idx_x.shape[1]
+        result = None
+        for ty, tx in np.ndindex(len(idx_y), len(idx_x)):
+            if dim_y == 2:
+                rows, cols = idx_y[ty][:, np.newaxis], idx_x[tx][np.newaxis, :]
+            else:
+                rows, cols = idx_x[tx][np.newaxis, :], idx_y[ty][:, np.newaxis]
+            cell = self.cells[rows // self.cell_h, cols // self.cell_w]
+            index = (cell * self.cell_h + rows % self.cell_h) * self.cell_w + cols % self.cell_w
+            term = texels.index_select(0, torch.from_numpy(index.ravel()).to(texels.device))
+            weight = np.outer(wy[ty], wx[tx]).astype(np.float32)
+            if not np.all(weight == 1):
+                term = term * torch.from_numpy(weight.reshape(-1, 1)).to(term)
+            result = term if result is None else result + term
+        return result.view(out_h, out_w, b, c).permute(2, 3, 0, 1).contiguous()
@@ -0,0 +1,242 @@
+import ast
+import atexit
+import importlib
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import traceback
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Client, Listener
+from multiprocessing.shared_memory import SharedMemory
+
+import torch
+
+from .seamless_executor import check_interrupt
+
+POLL_INTERVAL = 0.05
+MAX_START_FAILURES = 3
+SHARED = "__skb_shared_tensor__"
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WORKER_PACKAGE = "skb_worker"
+BOOTSTRAP = (
+    "import importlib, sys, types\n"
+    "package = types.ModuleType({name!r})\n"
+    "package.__path__ = [{root!r}]\n"
+    "sys.modules[{name!r}] = package\n"
+    "importlib.import_module({name!r} + '.seamless_process').serve(sys.argv[1], sys.argv[2])\n"
+)
+
+
+def _shared_memory(name=None, create=False, size=0, track=True):
+    block = SharedMemory(name, create, size)
+    if not track and os.name == "posix":
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+def _map(value, fn):
+    if isinstance(value, tuple) and value[:1] == (SHARED,):
+        return fn(value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_map(item, fn) for item in value)
+    if isinstance(value, dict):
+        return {key: _map(item, fn) for key, item in value.items()}
+    return fn(value)
+
+
+def share(value, blocks, track=True):
+    def encode(item):
+        if not torch.is_tensor(item) or item.numel() == 0:
+            return item
+        item = item.detach().cpu()
+        block = _shared_memory(create=True, size=item.numel() * item.element_size(), track=track)
+        blocks.append(block)
+        torch.frombuffer(block.buf, dtype=item.dtype, count=item.numel()).view(item.shape).copy_(item)
+        return (SHARED, block.name, tuple(item.shape), str(item.dtype).split(".")[-1])
+    return _map(value, encode)
+
+
+def attach(value, blocks, copy=False, track=True):
+    def decode(item):
+        if not (isinstance(item, tuple) and item[:1] == (SHARED,)):
+            return item
+        _, name, shape, dtype = item
+        block = _shared_memory(name, track=track)
+        blocks.append(block)
+        dtype = getattr(torch, dtype)
+        count = 1
+        for size in shape:
+            count *= size
+        tensor = torch.frombuffer(block.buf, dtype=dtype, count=count).view(shape)
+        return tensor.clone() if copy else tensor
+    return _map(value, decode)
+
+
+def release(blocks, unlink=False):
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            pass
+        if unlink:
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+    blocks.clear()
+
+
+def serve(address, authkey):
+    conn = Client(ast.literal_eval(address), authkey=bytes.fromhex(authkey))
+    conn.send(os.getpid())
+    package = __name__.rpartition(".")[0]
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        module, class_name, function, args, kwargs = message
+        inputs, outputs = [], []
+        try:
+            node = getattr(importlib.import_module(f"{package}.{module}"), class_name)()
+            result = getattr(node, function)(*attach(args, inputs, track=False), **attach(kwargs, inputs, track=False))
+            reply = ("ok", share(result, outputs, track=False))
+        except Exception:
+            reply = ("error", traceback.format_exc())
+        result = args = kwargs = None
+        release(outputs)
+        conn.send(reply)
+        release(inputs)
+
+
+class Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+    def kill(self):
+        self.conn.close()
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class ProcessPool:
+    def __init__(self, size=1):
+        self.size = max(1, size)
+        self._authkey = secrets.token_bytes(16)
+        self._listener = Listener(authkey=self._authkey)
+        self._idle = queue.Queue()
+        self._pending = {}
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        threading.Thread(target=self._accept, name="skb-process-accept", daemon=True).start()
+        for _ in range(self.size):
+            self._spawn()
+
+    def _spawn(self):
+        command = [sys.executable, "-c", BOOTSTRAP.format(name=WORKER_PACKAGE, root=ROOT),
+                   repr(self._listener.address), self._authkey.hex()]
+        process = subprocess.Popen(command)
+        with self._lock:
+            self._pending[process.pid] = process
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+                pid = conn.recv()
+            except Exception:
+                continue
+            with self._lock:
+                process = self._pending.pop(pid, None)
+                if process is not None:
+                    self._failures = 0
+            if process is None:
+                conn.close()
+            else:
+                self._idle.put(Worker(process, conn))
+
+    def _reap(self):
+        with self._lock:
+            dead = [pid for pid, process in self._pending.items() if process.poll() is not None]
+            for pid in dead:
+                del self._pending[pid]
+            self._failures += len(dead)
+            failures = self._failures
+        if failures > MAX_START_FAILURES:
+            raise RuntimeError("SKB worker processes failed to start")
+        for _ in dead:
+            self._spawn()
+
+    def _acquire(self):
+        while True:
+            check_interrupt()
+            try:
+                worker = self._idle.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                self._reap()
+                continue
+            if worker.process.poll() is None:
+                return worker
+            self._discard(worker)
+
+    def _discard(self, worker):
+        worker.kill()
+        if not self._closed:
+            self._spawn()
+
+    def run(self, cls, function, *args, **kwargs):
+        worker = self._acquire()
+        inputs, outputs = [], []
+        try:
+            worker.conn.send((cls.__module__.rpartition(".")[2], cls.__name__, function, share(args, inputs), share(kwargs, inputs)))
+            while not worker.conn.poll(POLL_INTERVAL):
+                check_interrupt()
+                if worker.process.poll() is not None:
+                    raise RuntimeError(f"SKB worker process exited with code {worker.process.returncode}")
+            status, result = worker.conn.recv()
+        except BaseException:
+            self._discard(worker)
+            raise
+        finally:
+            release(inputs, unlink=True)
+
+        self._idle.put(worker)
+        if status == "error":
+            raise RuntimeError(f"SKB worker process failed:\n{result}")
+        try:
+            return attach(result, outputs, copy=True)
+        finally:
+            release(outputs, unlink=True)
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for process in pending:
+            process.kill()
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def process_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPool(int(os.environ.get("SKB_PROCESS_WORKERS", "1")))
+            atexit.register(_POOL.close)
+        return _POOL
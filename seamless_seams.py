@@ -0,0 +1,63 @@
+import torch
+import torch.nn.functional as F
+
+SEARCH_SIZE = 96
+OVERLAP_STEP = 8
+MAX_OVERLAP = 256
+STRIP_ELEMENTS = 1 << 22
+
+
+def gradient_energy(image, strip_elements=STRIP_ELEMENTS):
+    b, c, h, w = image.shape
+    rows = max(1, strip_elements // max(1, b * c * w))
+    vertical = horizontal = torch.zeros(b, dtype=torch.float64)
+    for start in range(0, h, rows):
+        strip = image[:, :, start:start + rows + 1].float()
+        vertical = vertical + torch.diff(strip, dim=2).pow(2).sum(dim=(1, 2, 3), dtype=torch.float64)
+        horizontal = horizontal + torch.diff(strip[:, :, :rows], dim=3).pow(2).sum(dim=(1, 2, 3), dtype=torch.float64)
+    vertical /= max(1, c * (h - 1) * w)
+    horizontal /= max(1, c * h * (w - 1))
+    return ((vertical + horizontal) / 2).float()
+
+
+def seam_score(canvas, reference=None):
+    # Scored per item and averaged, so a batch scores the same whether it is rendered whole or split across workers.
+    if reference is None:
+        reference = gradient_energy(canvas)
+    rows = (canvas[:, :, 0] - canvas[:, :, -1]).float().pow(2).mean(dim=(1, 2))
+    cols = (canvas[..., 0] - canvas[..., -1]).float().pow(2).mean(dim=(1, 2))
+    return float(((rows + cols) / 2 / torch.as_tensor(reference).clamp(min=1e-12)).mean())
+
+
+def overlap_candidates(h, w, step=OVERLAP_STEP):
+    limit = min(MAX_OVERLAP, h // 2, w // 2)
+    return list(range(step, limit + 1, step)) or [max(1, limit)]
+
+
+def search_overlap(stages, texture, build, initial=None, keep=3):
+    h, w = stages.image_size(texture)
+    candidates = overlap_candidates(h, w)
+
+    factor = 1
+    while min(h, w) // (factor * 2) >= SEARCH_SIZE:
+        factor *= 2
+
+    if factor > 1 and len(candidates) > keep:
+        coarse = F.avg_pool2d(stages.to_tensor(texture), factor)
+        reference = gradient_energy(coarse)
+        coarse = stages.to_batch(coarse)
+        ch, cw = stages.image_size(coarse)
+        scaled = {overlap: min(max(1, round(overlap / factor)), ch // 2, cw // 2) for overlap in candidates}
+        scores = {size: seam_score(stages.to_tensor(build(coarse, size)), reference) for size in set(scaled.values())}
+        candidates = sorted(candidates, key=lambda overlap: scores[scaled[overlap]])[:keep]
+    if initial is not None and initial not in candidates:
+        candidates.append(initial)
+
+    reference = gradient_energy(stages.to_tensor(texture))
+    best = None
+    for overlap in candidates:
+        canvas = build(texture, overlap)
+        score = seam_score(stages.to_tensor(canvas), reference)
+        if best is None or score < best[1]:
+            best = (overlap, score, canvas)
+    return best
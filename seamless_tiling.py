@@ -0,0 +1,39 @@
+import math
+
+TILE_BYTES_PER_PIXEL = 96
+MIN_TILE = 128
+HYSTERESIS_MARGIN = 32
+
+
+def gaussian_radius(sigma, truncate=4.0):
+    return int(truncate * float(sigma) + 0.5)
+
+
+def canny_halo(sigma):
+    return gaussian_radius(sigma) + 2 + HYSTERESIS_MARGIN
+
+
+def budget_tile_size(h, w, batch, memory_budget_mb, halo=0):
+    if memory_budget_mb <= 0:
+        return None
+    budget = memory_budget_mb * 1024 * 1024
+    if h * w * batch * TILE_BYTES_PER_PIXEL <= budget:
+        return None
+    side = int(math.sqrt(budget / (TILE_BYTES_PER_PIXEL * batch))) - 2 * halo
+    return max(MIN_TILE, side)
+
+
+def iter_tiles(h, w, tile=None, halo=0):
+    if tile is None:
+        full = (slice(0, h), slice(0, w))
+        yield full, full, full
+        return
+    for y0 in range(0, h, tile):
+        y1 = min(y0 + tile, h)
+        hy0, hy1 = max(0, y0 - halo), min(h, y1 + halo)
+        for x0 in range(0, w, tile):
+            x1 = min(x0 + tile, w)
+            hx0, hx1 = max(0, x0 - halo), min(w, x1 + halo)
+            yield ((slice(hy0, hy1), slice(hx0, hx1)),
+                   (slice(y0 - hy0, y1 - hy0), slice(x0 - hx0, x1 - hx0)),
+                   (slice(y0, y1), slice(x0, x1)))
@@ -0,0 +1,401 @@
+import torch
+import torch.nn.functional as F
+import numpy as np
+from scipy import ndimage
+
+from .seamless_clahe import equalize_adapthist
+from .seamless_cut import min_cut_seam, seam_alpha
+from .seamless_masks import seamless_blend_mask, edge_blur_mask, edge_fade_mask
+from .seamless_edges import EDGE_MAPS
+from .seamless_tiling import budget_tile_size, iter_tiles, gaussian_radius, canny_halo
+
+XYZ_FROM_RGB = torch.tensor([[0.412453, 0.357580, 0.180423],
+                             [0.212671, 0.715160, 0.072169],
+                             [0.019334, 0.119193, 0.950227]], dtype=torch.float64)
+RGB_FROM_XYZ = torch.linalg.inv(XYZ_FROM_RGB)
+REF_WHITE = (0.95047, 1.0, 1.08883)
+
+
+def pad_axis(x, before, after, dim, mode="reflect"):
+    if before == 0 and after == 0:
+        return x
+    size = x.shape[dim]
+    if mode == "constant":
+        pad = [0, 0] * (x.ndim - dim - 1) + [before, after]
+        return F.pad(x, pad)
+    idx = torch.arange(-before, size + after, device=x.device)
+    if mode == "reflect":
+        idx = torch.remainder(idx, 2 * size)
+        idx = torch.where(idx >= size, 2 * size - 1 - idx, idx)
+    elif mode == "wrap":
+        idx = torch.remainder(idx, size)
+    elif mode == "nearest":
+        idx = idx.clamp(0, size - 1)
+    else:
+        raise ValueError(f"Unknown pad mode: {mode}")
+    return x.index_select(dim, idx)
+
+
+def gaussian_kernel1d(sigma, truncate=4.0, dtype=torch.float32, device=None):
+    radius = int(truncate * float(sigma) + 0.5)
+    x = torch.arange(-radius, radius + 1, dtype=torch.float64)
+    kernel = torch.exp(-0.5 * (x / sigma) ** 2)
+    kernel = kernel / kernel.sum()
+    return kernel.to(dtype=dtype, device=device)
+
+
+def correlate1d(x, weights, dim, mode="reflect"):
+    radius = (weights.numel() - 1) // 2
+    padded = pad_axis(x, radius, weights.numel() - 1 - radius, dim, mode)
+    c = x.shape[1]
+    shape = (c, 1, -1, 1) if dim == 2 else (c, 1, 1, -1)
+    kernel = weights.to(dtype=x.dtype, device=x.device).view(1, 1, -1).expand(c, 1, -1).reshape(shape)
+    return F.conv2d(padded, kernel, groups=c)
+
+
+def gaussian_blur(x, sigma, mode="reflect", truncate=4.0):
+    if sigma <= 0:
+        return x
+    kernel = gaussian_kernel1d(sigma, truncate, x.dtype, x.device)
+    return correlate1d(correlate1d(x, kernel, 2, mode), kernel, 3, mode)
+
+
+def pyramid_blur(x, sigma, base_sigma=4.0):
+    h, w = x.shape[2], x.shape[3]
+    factor = max(1.0, sigma / base_sigma)
+    if factor <= 1.0:
+        return gaussian_blur(x, sigma)
+    small = F.interpolate(x, size=(max(1, round(h / factor)), max(1, round(w / factor))), mode="area")
+    small = gaussian_blur(small, sigma / factor)
+    return F.interpolate(small, size=(h, w), mode="bilinear", align_corners=False)
+
+
+def fft_blur(x, sigma):
+    h, w = x.shape[2], x.shape[3]
+    extended = torch.cat([x, x.flip(2)], dim=2)
+    extended = torch.cat([extended, extended.flip(3)], dim=3)
+    fy = torch.fft.fftfreq(2 * h, dtype=torch.float64, device=x.device)[:, None]
+    fx = torch.fft.rfftfreq(2 * w, dtype=torch.float64, device=x.device)[None, :]
+    response = torch.exp(-2 * (torch.pi * sigma) ** 2 * (fy * fy + fx * fx)).to(x.dtype)
+    blurred = torch.fft.irfft2(torch.fft.rfft2(extended) * response, s=(2 * h, 2 * w))
+    return blurred[:, :, :h, :w].contiguous()
+
+
+def estimate_illumination(x, sigma, estimator="gaussian"):
+    if estimator == "pyramid":
+        return pyramid_blur(x, sigma)
+    if estimator == "fft":
+        return fft_blur(x, sigma)
+    return gaussian_blur(x, sigma)
+
+
+def sobel(x, dim):
+    derivative = torch.tensor([-1.0, 0.0, 1.0])
+    smooth = torch.tensor([1.0, 2.0, 1.0])
+    other = 3 if dim == 2 else 2
+    return correlate1d(correlate1d(x, derivative, dim), smooth, other)
+
+
+def canny(gray, sigma, low_threshold=0.1, high_threshold=0.2):
+    n, _, h, w = gray.shape
+    bleed_over = gaussian_blur(torch.ones_like(gray[:1]), sigma, mode="constant") + torch.finfo(gray.dtype).eps
+    smoothed = gaussian_blur(gray, sigma, mode="constant") / bleed_over
+
+    jsobel = sobel(smoothed, 3)
+    isobel = sobel(smoothed, 2)
+    magnitude = torch.sqrt(isobel * isobel + jsobel * jsobel)
+
+    padded = F.pad(magnitude, (1, 1, 1, 1))
+
+    def neighbour(dy, dx):
+        return padded[:, :, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+
+    abs_i = isobel.abs()
+    abs_j = jsobel.abs()
+    same_sign = ((isobel >= 0) & (jsobel >= 0)) | ((isobel <= 0) & (jsobel <= 0))
+    opposite_sign = ((isobel <= 0) & (jsobel >= 0)) | ((isobel >= 0) & (jsobel <= 0))
+    w_i = abs_j / abs_i
+    w_j = abs_i / abs_j
+
+    sectors = [
+        (same_sign & (abs_i >= abs_j), w_i, (1, 0), (1, 1), (-1, 0), (-1, -1)),
+        (same_sign & (abs_i <= abs_j), w_j, (0, 1), (1, 1), (0, -1), (-1, -1)),
+        (opposite_sign & (abs_i <= abs_j), w_j, (0, 1), (-1, 1), (0, -1), (1, -1)),
+        (opposite_sign & (abs_i >= abs_j), w_i, (-1, 0), (-1, 1), (1, 0), (1, -1)),
+    ]
+    local_maxima = torch.zeros_like(magnitude, dtype=torch.bool)
+    for pts, weight, plus_1, plus_2, minus_1, minus_2 in sectors:
+        c_plus = neighbour(*plus_2) * weight + neighbour(*plus_1) * (1 - weight) <= magnitude
+        c_minus = neighbour(*minus_2) * weight + neighbour(*minus_1) * (1 - weight) <= magnitude
+        local_maxima = torch.where(pts, c_plus & c_minus, local_maxima)
+
+    local_maxima[:, :, :1, :] = False
+    local_maxima[:, :, -1:, :] = False
+    local_maxima[:, :, :, :1] = False
+    local_maxima[:, :, :, -1:] = False
+
+    low_mask = local_maxima & (magnitude >= low_threshold)
+    high_mask = low_mask & (magnitude >= high_threshold)
+    return hysteresis(low_mask, high_mask)
+
+
+def hysteresis(low_mask, high_mask):
+    low_np = low_mask.cpu().numpy()
+    high_np = high_mask.cpu().numpy()
+    strel = np.ones((3, 3), bool)
+    result = np.zeros_like(low_np)
+    for idx in np.ndindex(low_np.shape[:2]):
+        labels, count = ndimage.label(low_np[idx], strel)
+        if count == 0:
+            continue
+        good_label = np.zeros((count + 1,), bool)
+        good_label[np.unique(labels[high_np[idx]])] = True
+        good_label[0] = False
+        result[idx] = good_label[labels]
+    return torch.from_numpy(result).to(low_mask.device)
+
+
+def rgb_to_lab(rgb):
+    rgb = torch.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = torch.einsum("ij,bjhw->bihw", XYZ_FROM_RGB.to(rgb), rgb)
+    white = torch.tensor(REF_WHITE).to(rgb).view(1, 3, 1, 1)
+    xyz = xyz / white
+    xyz = torch.where(xyz > 0.008856, xyz.clamp(min=0) ** (1.0 / 3.0), 7.787 * xyz + 16.0 / 116.0)
+    x, y, z = xyz[:, 0:1], xyz[:, 1:2], xyz[:, 2:3]
+    return torch.cat([116.0 * y - 16.0, 500.0 * (x - y), 200.0 * (y - z)], dim=1)
+
+
+def lab_to_rgb(lab):
+    l, a, b = lab[:, 0:1], lab[:, 1:2], lab[:, 2:3]
+    y = (l + 16.0) / 116.0
+    x = a / 500.0 + y
+    z = (y - b / 200.0).clamp(min=0)
+    xyz = torch.cat([x, y, z], dim=1)
+    xyz = torch.where(xyz > 0.2068966, xyz ** 3, (xyz - 16.0 / 116.0) / 7.787)
+    xyz = xyz * torch.tensor(REF_WHITE).to(lab).view(1, 3, 1, 1)
+    rgb = torch.einsum("ij,bjhw->bihw", RGB_FROM_XYZ.to(lab), xyz)
+    rgb = torch.where(rgb > 0.0031308, 1.055 * rgb.clamp(min=0) ** (1 / 2.4) - 0.055, 12.92 * rgb)
+    return rgb.clamp(0, 1)
+
+
+def amin(x, dims=(1, 2, 3)):
+    return x.amin(dim=dims, keepdim=True)
+
+
+def amax(x, dims=(1, 2, 3)):
+    return x.amax(dim=dims, keepdim=True)
+
+
+class TorchSeamlessEngine:
+    def to_batch(self, image):
+        image = image.detach().cpu()
+        if image.ndim == 3:
+            image = image.unsqueeze(0)
+
+        if image.ndim == 4 and image.shape[3] == 3:
+            image = image.permute(0, 3, 1, 2)
+        elif image.ndim == 4 and image.shape[1] == 3:
+            pass
+        else:
+            raise ValueError(f"Unexpected image shape: {tuple(image.shape)}")
+
+        return image.float().contiguous()
+
+    def to_tensor(self, image):
+        return image.contiguous()
+
+    def edge_tensor(self, edges):
+        return edges.float()
+
+    def image_size(self, image):
+        return image.shape[2], image.shape[3]
+
+    def simple_seamless(self, image, overlap, memory_budget_mb=0):
+        b, c, h, w = image.shape
+        o = overlap
+        seamless = pad_axis(pad_axis(image, o, o, 2, "wrap"), o, o, 3, "wrap")
+
+        mask = seamless_blend_mask(h, w, o)
+        edge_weight = EDGE_MAPS.get(self, image, 2, memory_budget_mb, smooth=2)
+
+        for _, _, (rows, cols) in iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb)):
+            inner_rows = slice(rows.start + o, rows.stop + o)
+            inner_cols = slice(cols.start + o, cols.stop + o)
+            inner = torch.from_numpy(mask.region(inner_rows, inner_cols)).float()
+            inner = inner * (1 - edge_weight[:, :, rows, cols] * 0.5)
+            center = seamless[:, :, inner_rows, inner_cols]
+            center.copy_(image[:, :, rows, cols] * (1 - inner) + center * inner)
+        return seamless
+
+    def edge_map(self, image, sigma, memory_budget_mb=0, smooth=0, pad_mode=None):
+        halo = canny_halo(sigma) + (gaussian_radius(smooth) if smooth else 0)
+        if pad_mode is not None:
+            mode = "reflect" if pad_mode == "symmetric" else pad_mode
+            padded = pad_axis(pad_axis(image, halo, halo, 2, mode), halo, halo, 3, mode)
+            return self.edge_map(padded, sigma, memory_budget_mb, smooth)[:, :, halo:-halo, halo:-halo]
+
+        b, c, h, w = image.shape
+        edges = image.new_empty((b, 1, h, w), dtype=torch.float32 if smooth else torch.bool)
+
+        for (src_rows, src_cols), (crop_rows, crop_cols), (rows, cols) in iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb, halo), halo):
+            tile_edges = canny(image[:, :, src_rows, src_cols].mean(dim=1, keepdim=True), sigma=sigma)
+            if smooth:
+                tile_edges = gaussian_blur(tile_edges.float(), smooth)
+            edges[:, :, rows, cols] = tile_edges[:, :, crop_rows, crop_cols]
+        return edges
+
+    def mirror_seamless(self, image, overlap):
+        top = torch.cat([image, image.flip(3)], dim=3)
+        return torch.cat([top, top.flip(2)], dim=2)
+
+    def rotate_seamless(self, image, overlap):
+        b, c, h, w = image.shape
+        max_dim = max(h, w)
+        seamless = image.new_zeros((b, c, max_dim * 2, max_dim * 2))
+
+        seamless[:, :, :h, :w] = image
+
+        rotated_90 = torch.rot90(image, 1, dims=(2, 3))
+        seamless[:, :, max_dim:max_dim + rotated_90.shape[2], :rotated_90.shape[3]] = rotated_90
+
+        rotated_180 = torch.rot90(image, 2, dims=(2, 3))
+        seamless[:, :, max_dim:max_dim + rotated_180.shape[2], max_dim:max_dim + rotated_180.shape[3]] = rotated_180
+
+        rotated_270 = torch.rot90(image, 3, dims=(2, 3))
+        seamless[:, :, :rotated_270.shape[2], max_dim:max_dim + rotated_270.shape[3]] = rotated_270
+
+        seamless[:, :, h:h + overlap, :w] = image[:, :, :overlap, :]
+        seamless[:, :, :h, w:w + overlap] = image[:, :, :, :overlap]
+        seamless[:, :, max_dim + h - overlap:max_dim + h, max_dim:max_dim + w] = image[:, :, -overlap:, :]
+        seamless[:, :, max_dim:max_dim + h, max_dim + w - overlap:max_dim + w] = image[:, :, :, -overlap:]
+
+        return seamless
+
+    def min_cut_seamless(self, image, overlap, feather=0):
+        columns = self._cut_columns(image, overlap, feather)
+        return self._cut_columns(columns.transpose(2, 3), overlap, feather).transpose(2, 3).contiguous()
+
+    def _cut_columns(self, image, overlap, feather):
+        w = image.shape[3]
+        before, after = image[..., w - overlap:], image[..., :overlap]
+        seams = min_cut_seam((before - after).pow(2).sum(dim=1).cpu().numpy())
+        alpha = torch.from_numpy(seam_alpha(seams, overlap, feather)).to(image)[:, None]
+        result = image[..., :w - overlap].clone()
+        result[..., :overlap] = before * (1 - alpha) + after * alpha
+        return result
+
+    def apply_texture_direction(self, image, direction):
+        if direction == "vertical":
+            return torch.rot90(image, 1, dims=(2, 3))
+        elif direction == "diagonal":
+            return torch.rot90(image, 3, dims=(2, 3))
+        return image
+
+    def repeat_texture(self, image, repeat_count):
+        return image.repeat(1, 1, repeat_count, repeat_count)
+
+    def apply_edge_blur(self, image, edge_blur, memory_budget_mb=0):
+        b, c, h, w = image.shape
+        blur_width = max(1, int(edge_blur * min(h, w) * 0.1))
+        sigma = blur_width / 3
+        halo = gaussian_radius(sigma)
+        mask = edge_blur_mask(h, w, blur_width)
+
+        result = image.clone()
+        for (src_rows, src_cols), (crop_rows, crop_cols), (rows, cols) in iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb, halo), halo):
+            alpha = torch.from_numpy(mask.region(rows, cols)).float()
+            if not bool(alpha.any()):
+                continue
+            blurred = gaussian_blur(image[:, :, src_rows, src_cols], sigma)[:, :, crop_rows, crop_cols]
+            result[:, :, rows, cols] = image[:, :, rows, cols] * (1 - alpha) + blurred * alpha
+        return result
+
+    def apply_edge_fade(self, image, fade_strength):
+        b, c, h, w = image.shape
+        fade_width = int(min(h, w) * 0.15 * fade_strength)
+
+        if fade_width < 1:
+            return image.clone()
+
+        mask = torch.from_numpy(edge_fade_mask(h, w, fade_width).region()).float()
+
+        return image * mask
+
+    def apply_edge_padding(self, image, edge_padding):
+        b, c, h, w = image.shape
+        edge_padding = min(edge_padding, h // 4, w // 4)
+
+        if edge_padding > 0 and 2 * edge_padding < min(h, w):
+            return image[:, :, edge_padding:h - edge_padding, edge_padding:w - edge_padding].clone()
+
+        return image
+
+    def adjust_detail(self, image, detail_level, memory_budget_mb=0, edges=None):
+        if detail_level == 1.0:
+            return image
+
+        if edges is None:
+            edges = self.edge_map(image, 2 / detail_level, memory_budget_mb)
+        enhanced = torch.where(edges, image * detail_level, image)
+        return enhanced.clamp(0, 1)
+
+    def _equalize_l(self, l_channel, kernel_size, clip_limit):
+        return equalize_adapthist(l_channel[:, 0], kernel_size=kernel_size, clip_limit=clip_limit).unsqueeze(1)
+
+    def apply_gradient_removal(self, image, strength, estimator="gaussian"):
+        return self.apply_lab_stage(image, [("gradient_removal", (strength, estimator))])
+
+    def apply_light_equalization(self, image, strength):
+        return self.apply_lab_stage(image, [("light_equalization", (strength,))])
+
+    def apply_color_correction(self, image, strength, clip_limit, memory_budget_mb=0):
+        return self.apply_lab_stage(image, [("color_correction", (strength, clip_limit))], memory_budget_mb)
+
+    def apply_lab_stage(self, image, operations, memory_budget_mb=0):
+        b, c, h, w = image.shape
+        tiles = list(iter_tiles(h, w, budget_tile_size(h, w, b, memory_budget_mb)))
+
+        lab = None
+        l_channel = image.new_empty((b, 1, h, w))
+        for _, _, (rows, cols) in tiles:
+            tile_lab = rgb_to_lab(image[:, :, rows, cols].clamp(0, 1))
+            l_channel[:, :, rows, cols] = tile_lab[:, 0:1]
+            if len(tiles) == 1:
+                lab = tile_lab
+
+        for name, params in operations:
+            l_channel = getattr(self, f"_lab_{name}")(l_channel, *params)
+
+        i_min, i_max = amin(image), amax(image)
+        result = torch.empty_like(image)
+        for _, _, (rows, cols) in tiles:
+            tile_lab = lab if lab is not None else rgb_to_lab(image[:, :, rows, cols].clamp(0, 1))
+            tile_lab = torch.cat([l_channel[:, :, rows, cols], tile_lab[:, 1:]], dim=1)
+            result[:, :, rows, cols] = lab_to_rgb(tile_lab) * (i_max - i_min) + i_min
+        return result
+
+    def _lab_gradient_removal(self, l_raw, strength, estimator="gaussian"):
+        b, c, h, w = l_raw.shape
+        l_min, l_max = amin(l_raw), amax(l_raw)
+        l_channel = (l_raw - l_min) / (l_max - l_min)
+
+        gradient = estimate_illumination(l_channel, min(h, w) / 4, estimator)
+        gradient = (gradient - amin(gradient)) / (amax(gradient) - amin(gradient))
+
+        l_corrected = (l_channel - (gradient - 0.5) * strength).clamp(0, 1)
+        return l_corrected * (l_max - l_min) + l_min
+
+    def _lab_light_equalization(self, l_raw, strength):
+        b, c, h, w = l_raw.shape
+        l_min, l_max = amin(l_raw), amax(l_raw)
+        l_channel = (l_raw - l_min) / (l_max - l_min)
+
+        l_equalized = self._equalize_l(l_channel, int(min(h, w) / 8), 0.01)
+        l_mixed = l_channel * (1 - strength) + l_equalized * strength
+        return l_mixed * (l_max - l_min) + l_min
+
+    def _lab_color_correction(self, l_raw, strength, clip_limit):
+        l_normalized = (l_raw - amin(l_raw)) / (amax(l_raw) - amin(l_raw))
+
+        clahe = self._equalize_l(l_normalized, None, clip_limit)
+        return l_raw * (1 - strength) + (clahe * 100) * strength
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import torch
+
+from .seamless_cache import content_key
+from .seamless_cut import min_cut_seam, seam_alpha
+from .skb_lru import ByteLRU
+
+COLORS = 2
+TILE_COUNT = COLORS ** 4
+DEFAULT_MAX_MB = 512
+
+
+def _join(before, after, channels, feather):
+    errors = (before[:, :channels] - after[:, :channels]).pow(2).sum(dim=1)
+    seams = min_cut_seam(errors.float().cpu().numpy())
+    alpha = torch.from_numpy(seam_alpha(seams, before.shape[3], feather)).to(before)[:, None]
+    return before * (1 - alpha) + after * alpha
+
+
+def _frame(inner, left, right, overlap, channels, feather):
+    o = overlap
+    w = inner.shape[3]
+    lw, rw = left.shape[3], right.shape[3]
+    result = inner.clone()
+    result[..., :lw - o] = left[..., :lw - o]
+    result[..., lw - o:lw] = _join(left[..., lw - o:], inner[..., lw - o:lw], channels, feather)
+    result[..., w - rw:w - rw + o] = _join(inner[..., w - rw:w - rw + o], right[..., :o], channels, feather)
+    result[..., w - rw + o:] = right[..., o:]
+    return result
+
+
+def _edge_strip(texture, source, overlap, channels, feather):
+    o = overlap
+    strip = torch.roll(texture, 2 * o, dims=2)[:, :, :4 * o]
+    inner = torch.roll(source, 2 * o, dims=2)[:, :, :4 * o]
+    return _frame(inner, strip[..., :3 * o], strip[..., -3 * o:], o, channels, feather)
+
+
+def wang_overlap(h, w, overlap):
+    return max(1, min(overlap, h // 6, w // 6))
+
+
+def build_wang_tiles(texture, overlap, seed=0, channels=3, feather=0):
+    b, c, h, w = texture.shape
+    o = wang_overlap(h, w, overlap)
+    rng = np.random.default_rng(seed)
+    shifts = rng.integers(0, (h, w), size=(2 * COLORS + TILE_COUNT, 2)).tolist()
+
+    def shifted(index):
+        return torch.roll(texture, shifts[index], dims=(2, 3))
+
+    transposed = texture.transpose(2, 3)
+    horizontal = [_edge_strip(texture, shifted(color), o, channels, feather) for color in range(COLORS)]
+    vertical = [_edge_strip(transposed, shifted(COLORS + color).transpose(2, 3), o, channels, feather).transpose(2, 3) for color in range(COLORS)]
+
+    tiles = texture.new_empty((b, TILE_COUNT, c, h, w))
+    for index in range(TILE_COUNT):
+        north, east, south, west = (index >> bit & 1 for bit in range(4))
+        tile = _frame(shifted(2 * COLORS + index), vertical[west][..., 2 * o:], vertical[east][..., :2 * o], o, channels, feather)
+        tile = _frame(tile.transpose(2, 3), horizontal[north][:, :, 2 * o:].transpose(2, 3), horizontal[south][:, :, :2 * o].transpose(2, 3), o, channels, feather)
+        tiles[:, index] = tile.transpose(2, 3)
+    return tiles
+
+
+def wang_cells(rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    horizontal = rng.integers(0, COLORS, size=(rows, cols))
+    vertical = rng.integers(0, COLORS, size=(rows, cols))
+    north, south = horizontal, np.roll(horizontal, -1, axis=0)
+    west, east = vertical, np.roll(vertical, -1, axis=1)
+    return north | east << 1 | south << 2 | west << 3
+
+
+class WangTileService:
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, max_entries=4):
+        self.cache = ByteLRU(max_bytes, max_entries)
+
+    def get(self, texture, overlap, seed=0, channels=3, feather=0):
+        key = content_key(texture, overlap, seed, channels, feather)
+        return self.cache.get_or_build(key, lambda: build_wang_tiles(texture, overlap, seed, channels, feather),
+                                       lambda tiles: tiles.numel() * tiles.element_size())
+
+    def clear(self):
+        self.cache.clear()
+
+
+WANG_TILES = WangTileService(int(os.environ.get("SKB_WANG_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+
+class ByteLRU:
+    def __init__(self, max_bytes, max_entries=0):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            if nbytes > self.max_bytes:
+                return [key]
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            while self._entries and (self.total_bytes > self.max_bytes or 0 < self.max_entries < len(self._entries)):
+                name, (_, size) = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(name)
+        return evicted
+
+    def get_or_build(self, key, build, nbytes):
+        value = self.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.put(key, value, nbytes(value))
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
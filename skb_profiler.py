@@ -0,0 +1,243 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODE = os.environ.get("SKB_PROFILE", "").lower()
+ENABLED = PROFILE_MODE not in ("", "0", "false", "off")
+TRACE_MEMORY = PROFILE_MODE == "memory"
+LOG_EXECUTIONS = os.environ.get("SKB_PROFILE_LOG", "").lower() not in ("", "0", "false", "off")
+WINDOW = int(os.environ.get("SKB_PROFILE_WINDOW", "256"))
+
+
+class TimingStats:
+    def __init__(self, window=WINDOW):
+        self.durations = deque(maxlen=window)
+        self.peaks = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.last_inputs = None
+        self.last_outputs = None
+
+    def record(self, duration, peak_mb=None, inputs=None, outputs=None):
+        self.durations.append(duration)
+        self.count += 1
+        self.total += duration
+        if peak_mb is not None:
+            self.peaks.append(peak_mb)
+        if inputs is not None:
+            self.last_inputs = inputs
+        if outputs is not None:
+            self.last_outputs = outputs
+
+    def summary(self):
+        durations = np.array(self.durations) * 1000
+        p50, p90, p99 = np.percentile(durations, [50, 90, 99]) if len(durations) else (0.0, 0.0, 0.0)
+        result = {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(float(durations.mean()), 3) if len(durations) else 0.0,
+            "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(durations.max()), 3) if len(durations) else 0.0,
+        }
+        if self.peaks:
+            result["peak_mb"] = round(max(self.peaks), 3)
+            result["last_peak_mb"] = round(self.peaks[-1], 3)
+        if self.last_inputs is not None:
+            result["inputs"] = self.last_inputs
+        if self.last_outputs is not None:
+            result["outputs"] = self.last_outputs
+        return result
+
+
+def _rss_reader():
+    try:
+        import psutil
+        process = psutil.Process()
+        return lambda: process.memory_info().rss
+    except ImportError:
+        pass
+    if os.path.exists("/proc/self/statm"):
+        page = os.sysconf("SC_PAGE_SIZE")
+
+        def read():
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * page
+        return read
+    return None
+
+
+class PeakMemory:
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.read_rss = _rss_reader()
+        self.peak_mb = 0.0
+        self.source = "rss" if self.read_rss else "tracemalloc"
+
+    def _sample(self):
+        while not self._done.is_set():
+            self._peak = max(self._peak, self.read_rss())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        if self.read_rss is None:
+            tracemalloc.start()
+            return self
+        self._done = threading.Event()
+        self._start = self._peak = self.read_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.read_rss is None:
+            self.peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            return
+        self._done.set()
+        self._thread.join()
+        self._peak = max(self._peak, self.read_rss())
+        self.peak_mb = (self._peak - self._start) / 2 ** 20
+
+
+_STACK = contextvars.ContextVar("skb_profile_stack", default=())
+
+
+class Profiler:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _record(self, name, *args, **kwargs):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = TimingStats()
+            stats.record(*args, **kwargs)
+
+    @contextmanager
+    def span(self, name):
+        stack = _STACK.get()
+        full_name = f"{stack[-1][0]}/{name}" if stack else name
+        token = _STACK.set(stack + ((full_name, []),))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            _STACK.reset(token)
+            self._record(full_name, duration)
+            if stack:
+                stack[-1][1].append((name, duration))
+
+    def run_node(self, name, fn, args, kwargs):
+        memory = PeakMemory() if TRACE_MEMORY else _NULL_SPAN
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+
+        children = []
+        token = _STACK.set(_STACK.get() + ((name, children),))
+        start = time.perf_counter()
+        try:
+            with memory:
+                result = fn(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            _STACK.reset(token)
+
+        peak_mb = memory.peak_mb if TRACE_MEMORY else None
+        if torch.cuda.is_available():
+            peak_mb = max(peak_mb or 0.0, torch.cuda.max_memory_allocated() / 2 ** 20)
+
+        self._record(name, duration, peak_mb, describe(kwargs), describe(result))
+        if LOG_EXECUTIONS:
+            spans = ", ".join(f"{child} {child_duration * 1000:.1f} ms" for child, child_duration in children)
+            logger.info(f"[SKB profile] {name} {duration * 1000:.1f} ms" + (f" ({spans})" if spans else ""))
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.summary() for name, stats in sorted(self._stats.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+PROFILER = Profiler()
+
+
+def describe(value):
+    if isinstance(value, (torch.Tensor, np.ndarray)):
+        return {"shape": list(value.shape), "dtype": str(value.dtype)}
+    if isinstance(value, dict):
+        described = {key: describe(item) for key, item in value.items()}
+        return {key: item for key, item in described.items() if item is not None} or None
+    if isinstance(value, (tuple, list)):
+        described = [describe(item) for item in value]
+        return described if any(item is not None for item in described) else None
+    return None
+
+
+def span(name):
+    if not ENABLED:
+        return _NULL_SPAN
+    return PROFILER.span(name)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def instrument_node(node_name, cls):
+    function_name = getattr(cls, "FUNCTION", None)
+    function = inspect.getattr_static(cls, function_name, None) if function_name else None
+    if not ENABLED or not inspect.isfunction(function) or getattr(function, "_skb_profiled", False):
+        return cls
+
+    name = f"{node_name}.{function_name}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return PROFILER.run_node(name, function, args, kwargs)
+
+    wrapper._skb_profiled = True
+    setattr(cls, function_name, wrapper)
+    return cls
+
+
+def register_routes():
+    if not ENABLED:
+        return
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except ImportError:
+        return
+
+    @PromptServer.instance.routes.get("/skb/profile")
+    async def get_profile(request):
+        snapshot = PROFILER.snapshot()
+        if request.query.get("reset") in ("1", "true"):
+            PROFILER.reset()
+        return web.json_response(snapshot)